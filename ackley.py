@@ -2,14 +2,13 @@
 
 #This implementation of the Ackley function is intended to work with two or more variables.
 
-print("I've been imported!")
-
 import numpy as np
 
 def AckleyFunc(x, lengthParam = 4.0, invert=False, trans=True, amp = 5.0):
 	'''
 	Parameters:
-		x           :   Array/list of positioner values
+		x           :   Array/list of positioner values.  A 2-D array is treated as one
+							set of positioner values per row and returns one value per row.
 		lengthParam :   scale length - needed to change the number of extrema
 		invert      :   A boolean that determines whether the function performs
 							normally or inverts the value.
@@ -18,13 +17,14 @@ def AckleyFunc(x, lengthParam = 4.0, invert=False, trans=True, amp = 5.0):
 		amp			:	A float that is the relative amplitude between the exponential
 							and sinusoidal parts of the function.
 	'''
-	d = 1 / len(x)
+	x = np.asarray(x, dtype = float)
+	d = 1 / x.shape[-1]
 	value = None
 
 	#part1 = -0.2 * np.sqrt(0.5 * np.sum(np.power(x, 2)))
 	#part2 = 0.5 * np.sum(np.cos(np.multiply(x, 2.0 * np.pi / lengthParam)))
-	part1 = -0.2 * np.sqrt(d * np.sum(np.power(x, 2)))
-	part2 = d * np.sum(np.cos(np.multiply(x, 2.0 * np.pi / lengthParam)))
+	part1 = -0.2 * np.sqrt(d * np.sum(np.power(x, 2), axis = -1))
+	part2 = d * np.sum(np.cos(np.multiply(x, 2.0 * np.pi / lengthParam)), axis = -1)
 
 	if trans:
 		value = (amp * np.exp(part1) + np.exp(part2) - np.e)/amp
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+
+#Moves beamline motors to each individual's configuration and reads back its fitness using asyncio.
+
+import asyncio
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+class MoveTimeoutError(TimeoutError):
+    '''Exception raised when motors do not reach a configuration in time'''
+
+    def __init__(self, message):
+        super().__init__(message)
+
+class BeamlineControl():
+    """
+    Interface to the motors and process variables (PVs) of a beamline.  Subclasses implement Move() and Read() as
+        coroutines so that moves on independent axes can run at the same time.
+
+    ...
+
+    Methods
+    -------
+    Move(name, value)
+        Moves a motor to value and returns once it has arrived.
+    Read(pv)
+        Returns the current value of a PV.
+    Readback(name)
+        Returns the current position of a motor, including while it is moving.  Only needed by Observer Mode.
+    """
+
+    async def Move(self, name, value):
+        raise NotImplementedError
+
+    async def Read(self, pv):
+        raise NotImplementedError
+
+    async def Readback(self, name):
+        raise NotImplementedError
+
+class EpicsControl(BeamlineControl):
+    """
+    Controls EPICS motors and PVs through pyepics.  The blocking pyepics calls are run in worker threads so the moves
+        can still overlap.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Timeout in seconds passed to each pyepics call (Default value is None, which uses the pyepics default).
+    """
+
+    def __init__(self, timeout = None):
+        #pyepics is only needed when talking to a live control system
+        import epics
+
+        self._epics = epics
+        self.timeout = timeout
+
+    async def Move(self, name, value):
+        await asyncio.to_thread(self._epics.caput, name, value, wait = True, timeout = self.timeout)
+
+    async def Read(self, pv):
+        return await asyncio.to_thread(self._epics.caget, pv, timeout = self.timeout)
+
+    async def Readback(self, name):
+        #The RBV field of a motor record follows the motor while it moves
+        return await asyncio.to_thread(self._epics.caget, f"{name}.RBV", timeout = self.timeout)
+
+async def MoveTo(control, names, values, timeout = None):
+    """
+    Moves several motors at once and waits for all of them to arrive.
+
+    Parameters
+    ----------
+    control : BeamlineControl
+        The beamline to move.
+    names : list of str
+        Name (PV name for epics motors) of each motor.
+    values : list of float
+        Target position of each motor.
+    timeout : float, optional
+        Seconds to wait for the motors (Default value is None, which waits indefinitely).
+    """
+    moves = asyncio.gather(*[control.Move(names[i], float(values[i])) for i in range(len(names))])
+
+    try:
+        await asyncio.wait_for(moves, timeout)
+    except asyncio.TimeoutError:
+        raise MoveTimeoutError(f"Motors did not reach {np.asarray(values).tolist()} within {timeout} s.") from None
+
+async def MeasureAsync(control, names, individuals, pv, timeout = None, timings = None):
+    """
+    Moves the beamline to each individual's configuration in turn and reads its fitness.
+
+    Parameters
+    ----------
+    control : BeamlineControl
+        The beamline to measure.
+    names : list of str
+        Name (PV name for epics motors) of each motor.
+    individuals : numpy array
+        Motor positions with one row per individual (individuals x motors).
+    pv : str
+        PV holding the fitness value.
+    timeout : float, optional
+        Seconds to wait for each move (Default value is None, which waits indefinitely).
+    timings : dict, optional
+        If given, the seconds spent moving and reading are added to its 'move' and 'read' entries (Default value is None).
+
+    Returns
+    -------
+    numpy array
+        The fitness of each individual in the order given.
+    """
+    fitness = np.zeros(len(individuals))
+    moveTime = readTime = 0.0
+
+    for i in range(len(individuals)):
+        start = time.perf_counter()
+        await MoveTo(control, names, individuals[i], timeout)
+        moved = time.perf_counter()
+        fitness[i] = await control.Read(pv)
+
+        moveTime += moved - start
+        readTime += time.perf_counter() - moved
+
+    if timings is not None:
+        timings["move"] = timings.get("move", 0.0) + moveTime
+        timings["read"] = timings.get("read", 0.0) + readTime
+
+    return fitness
+
+def RunSync(coroutine):
+    """
+    Runs a coroutine to completion and returns its result.  When called from a running event loop (e.g. a Jupyter
+        session), the coroutine runs on its own loop in a helper thread while the caller waits, since asyncio.run()
+        cannot be nested.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers = 1) as pool:
+        return pool.submit(asyncio.run, coroutine).result()
+
+def Measure(control, names, individuals, pv, timeout = None, timings = None):
+    """
+    Runs MeasureAsync() to completion with RunSync().
+    """
+    return RunSync(MeasureAsync(control, names, individuals, pv, timeout, timings))
+
+class RingBuffer():
+    """
+    Fixed-size buffer of timestamped samples.  Once full, each new sample overwrites the oldest one, so sampling at a high
+        rate never allocates.
+
+    ...
+
+    Parameters
+    ----------
+    capacity : int
+        Number of samples kept.
+    width : int
+        Number of values in each sample.
+
+    Attributes
+    ----------
+    count : int
+        Number of samples appended since the buffer was created or cleared, including overwritten ones.
+
+    Methods
+    -------
+    Append(t, values)
+        Adds a sample taken at time t.
+    Since(start)
+        Returns the samples kept that were taken at or after start, oldest first.
+    Clear()
+        Empties the buffer.
+    """
+
+    def __init__(self, capacity, width):
+        if capacity < 1:
+            raise ValueError(f"{capacity} is not a valid capacity.")
+
+        self.capacity = int(capacity)
+        self.times = np.zeros(self.capacity)
+        self.values = np.zeros((self.capacity, width))
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def Clear(self):
+        self.count = 0
+
+    def Append(self, t, values):
+        slot = self.count % self.capacity
+        self.times[slot] = t
+        self.values[slot] = values
+        self.count += 1
+
+    def Since(self, start):
+        """
+        Returns the times (samples) and values (samples x width) of the samples taken at or after start, oldest first.
+        """
+        #Slots in the order they were written, starting from the oldest sample kept
+        order = (np.arange(len(self)) + max(self.count - self.capacity, 0)) % self.capacity
+        times = self.times[order]
+        first = np.searchsorted(times, start)
+
+        return times[first:], self.values[order[first:]]
+
+def BestTransitPoint(readbacks, samples, start, window = 1):
+    """
+    Finds the best fitness sample taken since start and where the motors were when it was taken.
+
+    Parameters
+    ----------
+    readbacks : RingBuffer
+        Timestamped motor readbacks (width nMotors).
+    samples : RingBuffer
+        Timestamped fitness samples (width 1).
+    start : float
+        Time the transition started.
+    window : int, optional
+        Number of consecutive samples averaged before looking for the best one, which lowers the noise of the value
+            found (Default value is 1).
+
+    Returns
+    -------
+    tuple of (numpy array, float, float) or None
+        The motor positions, interpolated between the readbacks on either side of the middle of the best window, the
+            average fitness of that window, and the noise of a single sample estimated from the differences between
+            consecutive samples.  None if no sample was taken between two readbacks.
+    """
+    times, positions = readbacks.Since(start)
+    sampleTimes, values = samples.Since(start)
+
+    #Only samples bracketed by readbacks can be placed
+    inside = (sampleTimes >= times[0]) & (sampleTimes <= times[-1]) if len(times) > 0 else np.zeros(0, dtype = bool)
+
+    if not inside.any():
+        return None
+
+    sampleTimes = sampleTimes[inside]
+    values = values[inside, 0]
+    window = min(window, len(values))
+
+    #Moving averages of window samples, each placed at the mean time of its samples
+    kernel = np.full(window, 1 / window)
+    smoothed = np.convolve(values, kernel, mode = "valid")
+    smoothedTimes = np.convolve(sampleTimes, kernel, mode = "valid")
+    best = np.argmax(smoothed)
+
+    #The fitness barely changes between consecutive samples, so their differences are mostly noise (median absolute
+    #   deviation, scaled to a standard deviation)
+    noise = np.median(np.abs(np.diff(values))) / (0.6745 * np.sqrt(2)) if len(values) > 1 else 0.0
+
+    #Each motor's position is interpolated independently; readbacks are in time order
+    position = np.array([np.interp(smoothedTimes[best], times, positions[:, m]) for m in range(positions.shape[1])])
+
+    return position, smoothed[best], noise
+
+async def _Sample(control, names, pv, readbacks, samples, period):
+    """
+    Records motor readbacks and fitness samples until cancelled.
+    """
+    while True:
+        positions = await asyncio.gather(*[control.Readback(name) for name in names])
+        readbacks.Append(time.monotonic(), positions)
+        value = await control.Read(pv)
+        samples.Append(time.monotonic(), value)
+
+        #Always yield so the moves can make progress even when reads return immediately
+        await asyncio.sleep(period)
+
+async def ObserveAsync(control, names, individuals, pv, timeout = None, timings = None, period = 0.005, capacity = 4096,
+                        window = 5, margin = 3.0):
+    """
+    Measures like MeasureAsync() while also sampling the motor readbacks and the fitness PV during each move, and finds
+        the best configuration passed through on the way to each individual (Observer Mode).
+
+    Parameters
+    ----------
+    control : BeamlineControl
+        The beamline to measure.  Must implement Readback().
+    names : list of str
+        Name (PV name for epics motors) of each motor.
+    individuals : numpy array
+        Motor positions with one row per individual (individuals x motors).
+    pv : str
+        PV holding the fitness value.
+    timeout : float, optional
+        Seconds to wait for each move (Default value is None, which waits indefinitely).
+    timings : dict, optional
+        If given, the seconds spent moving and reading are added to its 'move' and 'read' entries (Default value is None).
+    period : float, optional
+        Seconds to wait between samples during a move (Default value is 0.005).
+    capacity : int, optional
+        Number of samples kept by the ring buffers; later samples of a long move overwrite earlier ones (Default value
+            is 4096).
+    window : int, optional
+        Number of consecutive samples averaged when looking for the best configuration (Default value is 5).
+    margin : float, optional
+        How many times the estimated noise of a sample the best configuration must beat the fitness read at the
+            destination by, so that noise alone rarely wins (Default value is 3.0).
+
+    Returns
+    -------
+    tuple of numpy array
+        The fitness of each individual in the order given, the best configuration seen while moving to each individual
+            (individuals x motors), and its fitness (NaN when nothing was sampled during the move or it did not beat the
+            destination by the margin).
+    """
+    fitness = np.zeros(len(individuals))
+    points = np.full(np.shape(individuals), np.nan)
+    observed = np.full(len(individuals), np.nan)
+    readbacks = RingBuffer(capacity, len(names))
+    samples = RingBuffer(capacity, 1)
+    moveTime = readTime = 0.0
+
+    for i in range(len(individuals)):
+        start = time.perf_counter()
+        transit = time.monotonic()
+        sampler = asyncio.create_task(_Sample(control, names, pv, readbacks, samples, period))
+
+        try:
+            await MoveTo(control, names, individuals[i], timeout)
+        finally:
+            sampler.cancel()
+
+            try:
+                await sampler
+            except asyncio.CancelledError:
+                pass
+
+        moved = time.perf_counter()
+        positions = await asyncio.gather(*[control.Readback(name) for name in names])
+        readbacks.Append(time.monotonic(), positions)
+        fitness[i] = await control.Read(pv)
+
+        moveTime += moved - start
+        readTime += time.perf_counter() - moved
+
+        best = BestTransitPoint(readbacks, samples, transit, window)
+
+        if best is not None and best[1] > fitness[i] + margin * best[2]:
+            points[i], observed[i] = best[0], best[1]
+
+    if timings is not None:
+        timings["move"] = timings.get("move", 0.0) + moveTime
+        timings["read"] = timings.get("read", 0.0) + readTime
+
+    return fitness, points, observed
+
+def Observe(control, names, individuals, pv, timeout = None, timings = None, period = 0.005, capacity = 4096, window = 5,
+            margin = 3.0):
+    """
+    Runs ObserveAsync() to completion with RunSync().
+    """
+    return RunSync(ObserveAsync(control, names, individuals, pv, timeout, timings, period, capacity, window, margin))
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+
+#Times each stage of GA4Beamline.NextGeneration() over a grid of population sizes, motor counts and modes.
+#
+#   python benchmark.py --save baseline.json            record a baseline
+#   python benchmark.py --compare baseline.json         flag stages that got slower than the baseline
+#   python benchmark.py --target 0.99                   count the evaluations each mutation method needs to reach 0.99
+
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import numpy as np
+import ackley
+import ga4beamlines as ga
+
+STAGES = ["_ParentSel", "_Recombine", "_Mutate", "_Measure", "_SurvivorSel"]
+NPOPS = [10, 100, 1000, 10000]
+NMOTORS = [2, 20, 200]
+VERSION = 1
+
+def Cases(nPops = NPOPS, nMotors = NMOTORS, survivorModes = None, parentModes = None, cxModes = None, mutationModes = None):
+    """
+    Builds every combination of population size, motor count and mode.  Modes default to every entry of sMode, pMode,
+        cxMode and mMode.
+    """
+    modes = itertools.product(survivorModes or ga.sMode, parentModes or ga.pMode, cxModes or ga.cxMode,
+                                mutationModes or ga.mMode)
+    cases = []
+
+    for (s, p, cx, m), n, k in itertools.product(modes, nPops, nMotors):
+        cases.append({"survivorMode": s, "parentMode": p, "cxMode": cx, "mutationMode": m, "nPop": n, "nMotors": k})
+
+    return cases
+
+def Key(case):
+    return (f"{case['survivorMode']['name']}/{case['parentMode']['name']}/{case['cxMode']['name']}/"
+            f"{case['mutationMode']['name']}/nPop={case['nPop']}/motors={case['nMotors']}")
+
+def TimeCase(case, generations = 5, seed = 0):
+    """
+    Runs a case for a few generations and returns the median time of each stage in seconds.
+    """
+    motors = [{"name": f"m{i}", "lo": -2.0, "hi": 2.0, "sigma": 0.2} for i in range(case["nMotors"])]
+    algorithm = ga.GA4Beamline(motors, case["survivorMode"], case["parentMode"], case["cxMode"], case["mutationMode"],
+                                {"type": "Func", "name": ackley.AckleyFunc, "batch": True}, nPop = case["nPop"],
+                                seed = seed)
+    algorithm.FirstGeneration()
+    times = {stage: [] for stage in STAGES}
+
+    for g in range(generations):
+        for stage in STAGES:
+            start = time.perf_counter()
+            getattr(algorithm, stage)()
+            times[stage].append(time.perf_counter() - start)
+
+    return {stage: float(np.median(times[stage])) for stage in STAGES}
+
+def Run(cases, generations = 5, verbose = False):
+    """
+    Times every case.
+
+    Returns
+    -------
+    dict
+        Environment details and, under 'results', the stage times of each case keyed by Key().
+    """
+    results = {}
+
+    for case in cases:
+        results[Key(case)] = TimeCase(case, generations)
+
+        if verbose:
+            total = sum(results[Key(case)].values())
+            print(f"{Key(case):<60} {total * 1e3:10.3f} ms/generation")
+
+    return {"version": VERSION, "python": platform.python_version(), "numpy": np.__version__,
+            "machine": platform.machine(), "generations": generations, "results": results}
+
+def Compare(current, baseline, tolerance = 1.5, floor = 1e-4):
+    """
+    Finds the stages that are slower than in baseline.
+
+    Parameters
+    ----------
+    current : dict
+        Output of Run().
+    baseline : dict
+        Output of Run() saved earlier.
+    tolerance : float, optional
+        Ratio to the baseline time above which a stage counts as a regression (Default value is 1.5).
+    floor : float, optional
+        Stages faster than this many seconds in both runs are ignored as noise (Default value is 1e-4).
+
+    Returns
+    -------
+    list of dict
+        The case, stage, baseline and current time, and ratio of each regression.
+    """
+    regressions = []
+
+    for key, stages in current["results"].items():
+        if key not in baseline["results"]:
+            continue
+
+        for stage, seconds in stages.items():
+            before = baseline["results"][key].get(stage)
+
+            if before is None or max(before, seconds) < floor:
+                continue
+
+            if seconds > tolerance * max(before, floor):
+                regressions.append({"case": key, "stage": stage, "baseline": before, "current": seconds,
+                                    "ratio": seconds / max(before, floor)})
+
+    return regressions
+
+def EvaluationsToTarget(nMotors = (2, 5, 10, 20), mutationModes = None, target = 0.99, budget = 20000, seeds = range(5),
+                        nPop = 20, verbose = False):
+    """
+    Counts the fitness evaluations needed to reach target on AckleyFunc for each mutation method and motor count, with
+        genitor survivor selection, probRank parent selection and whole crossover.
+
+    Parameters
+    ----------
+    nMotors : list of int, optional
+        Motor counts to try (Default value is (2, 5, 10, 20)).
+    mutationModes : list of dict, optional
+        Mutation methods to compare (Default value is None, which uses every entry of mMode).
+    target : float, optional
+        Peak fitness to reach (Default value is 0.99).
+    budget : int, optional
+        Evaluations after which a run counts as a failure (Default value is 20000).
+    seeds : list of int, optional
+        Seed of each run of a case (Default value is range(5)).
+    nPop : int, optional
+        Population size (Default value is 20).
+
+    Returns
+    -------
+    dict
+        'median' (median evaluations of the successful runs, None if there were none) and 'success' (fraction of runs
+            that reached target) of each case, keyed by '<mutation method>/motors=<n>'.
+    """
+    results = {}
+
+    for m, n in itertools.product(mutationModes or ga.mMode, nMotors):
+        motors = [{"name": f"m{i}", "lo": -2.0, "hi": 2.0, "sigma": 0.2} for i in range(n)]
+        counts = []
+
+        for seed in seeds:
+            algorithm = ga.GA4Beamline(motors, ga.sMode[1], ga.pMode[0], ga.cxMode[2], m,
+                                        {"type": "Func", "name": ackley.AckleyFunc, "batch": True}, nPop = nPop,
+                                        seed = seed)
+            result = algorithm.Run(target = target, evaluations = budget)
+
+            if result["reason"] == "target":
+                counts.append(result["evaluations"])
+
+        key = f"{m['name']}/motors={n}"
+        results[key] = {"median": float(np.median(counts)) if len(counts) > 0 else None,
+                        "success": len(counts) / len(seeds)}
+
+        if verbose:
+            median = f"{results[key]['median']:10.0f}" if len(counts) > 0 else f"{'-':>10}"
+            print(f"{key:<30} {median} evaluations {results[key]['success']:6.0%} reached {target}")
+
+    return results
+
+def Main(argv = None):
+    parser = argparse.ArgumentParser(description = "Per-stage GA4Beamline throughput benchmark.")
+    parser.add_argument("--nPop", type = int, nargs = "+", default = NPOPS, help = "population sizes")
+    parser.add_argument("--motors", type = int, nargs = "+", help = "motor counts")
+    parser.add_argument("--quick", action = "store_true", help = "only time the first entry of each mode list")
+    parser.add_argument("--generations", type = int, default = 5, help = "generations timed per case")
+    parser.add_argument("--save", help = "file to write the results to")
+    parser.add_argument("--compare", help = "baseline file to check the results against")
+    parser.add_argument("--tolerance", type = float, default = 1.5, help = "slowdown ratio reported as a regression")
+    parser.add_argument("--target", type = float, help = "count the evaluations needed to reach this fitness instead")
+    parser.add_argument("--budget", type = int, default = 20000, help = "evaluation budget of each run with --target")
+    parser.add_argument("--seeds", type = int, default = 5, help = "runs of each case with --target")
+    args = parser.parse_args(argv)
+
+    if args.target is not None:
+        results = EvaluationsToTarget(args.motors or (2, 5, 10, 20), target = args.target, budget = args.budget, seeds = range(args.seeds),
+                                        verbose = True)
+
+        if args.save:
+            with open(args.save, "w") as file:
+                json.dump(results, file, indent = 1)
+
+        return 0
+
+    if args.quick:
+        cases = Cases(args.nPop, args.motors or NMOTORS, ga.sMode[:1], ga.pMode[:1], ga.cxMode[:1], ga.mMode[1:2])
+    else:
+        cases = Cases(args.nPop, args.motors or NMOTORS)
+
+    current = Run(cases, args.generations, verbose = True)
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(current, file, indent = 1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+
+        regressions = Compare(current, baseline, args.tolerance)
+
+        for r in regressions:
+            print(f"REGRESSION {r['case']} {r['stage']}: {r['baseline'] * 1e3:.3f} ms -> {r['current'] * 1e3:.3f} ms "
+                    f"({r['ratio']:.2f}x)")
+
+        if len(regressions) > 0:
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(Main())
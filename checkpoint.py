@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+#Saves the state of a GA4Beamline run so it can be resumed after an interruption.
+
+import importlib
+import json
+import os
+import numpy as np
+from ga4beamlines import GA4Beamline, BeamlineError
+from history import FitHistory, COLUMNS
+
+VERSION = 1
+
+def _FunctionName(func):
+    """
+    Returns 'module:qualname' for functions that can be imported again, otherwise None.
+    """
+    module = getattr(func, "__module__", None)
+    name = getattr(func, "__qualname__", None)
+
+    if module is None or name is None or "<" in name or module == "__main__":
+        return None
+
+    return f"{module}:{name}"
+
+def _ImportFunction(reference):
+    module, name = reference.split(":")
+    func = importlib.import_module(module)
+
+    for part in name.split("."):
+        func = getattr(func, part)
+
+    return func
+
+def Save(ga, path, sync = False):
+    """
+    Writes the state of ga to path.  The file is written next to path first and then renamed over it, so path always
+        holds a complete checkpoint.
+
+    Parameters
+    ----------
+    ga : GA4Beamline
+        The algorithm to save.  Should be between generations.
+    path : str
+        File to write (NumPy .npz format).
+    sync : bool, optional
+        Whether to flush the file to disk before renaming it (Default value is False).
+    """
+    fitness = {key: value for key, value in ga.fitness.items() if key not in ("name", "control")}
+
+    if ga.fitness["type"] == "Func":
+        fitness["function"] = _FunctionName(ga.fitness["name"])
+    elif ga.fitness["type"] == "epics":
+        fitness["name"] = ga.fitness["name"]
+    elif callable(fitness.get("metric")):
+        fitness["metric"] = None
+
+    history = ga.history.Pending()
+
+    meta = {"version": VERSION, "motors": ga.motors, "nPop": ga.nPop, "generation": ga.generation,
+            "evaluations": ga.evaluations, "observations": ga.observations,
+            "survivorMode": ga.sSel, "parentMode": ga.pSel, "cxMode": ga.cxMode, "mutationMode": ga.mMode,
+            "OM": ga.obsMode, "fitness": fitness, "batch": ga._batchFit, "rng": ga.rng.bit_generator.state,
+            "history": {"path": ga.history.path, "chunkSize": ga.history.chunkSize, "flushed": ga.history.flushed}}
+
+    arrays = {"genes": ga.pop.genes[:, :ga.pop.size], "fitness": ga.pop.fitness[:ga.pop.size],
+                "ranking": ga.pop.ranking[:ga.pop.size], "probability": ga.pop.probability[:ga.pop.size]}
+
+    for name in COLUMNS:
+        arrays[f"history_{name}"] = history[name]
+
+    if ga.pop.objectives is not None:
+        arrays["objectives"] = ga.pop.objectives[:, :ga.pop.size]
+    if ga.pop.sigmas is not None:
+        arrays["sigmas"] = ga.pop.sigmas[:, :ga.pop.size]
+
+    if ga.archive is not None and len(ga.archive) > 0:
+        arrays["archive_individuals"] = ga.archive.individuals
+        arrays["archive_objectives"] = ga.archive.objectives
+
+    tmpPath = f"{path}.tmp"
+
+    with open(tmpPath, "wb") as file:
+        np.savez(file, meta = np.array(json.dumps(meta)), **arrays)
+
+        if sync:
+            file.flush()
+            os.fsync(file.fileno())
+
+    os.replace(tmpPath, path)
+
+def Resume(path, fitness = None, **kwargs):
+    """
+    Rebuilds a GA4Beamline from a checkpoint.  The returned object continues with NextGeneration() exactly as the saved
+        one would have, including its random number stream.
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint written by Save() or Checkpointer.
+    fitness : dict, optional
+        Fitness to use (Default value is None, which re-imports the saved 'Func' function).  Must be given for 'epics'
+            and 'image' fitness, whose control and frame source cannot be saved, and for functions that cannot be
+            imported.
+    **kwargs
+        Other GA4Beamline arguments that are not saved (evaluator, scheduler, cache, checkpoint, surrogate).
+
+    Returns
+    -------
+    GA4Beamline
+    """
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        arrays = {key: data[key] for key in data.files if key != "meta"}
+
+    if meta["version"] > VERSION:
+        raise BeamlineError(f"Checkpoint version {meta['version']} is newer than the supported version {VERSION}.")
+
+    if fitness is None:
+        fitness = dict(meta["fitness"])
+        reference = fitness.pop("function", None)
+
+        if fitness["type"] != "Func" or reference is None:
+            raise BeamlineError("The fitness of this checkpoint cannot be restored; pass it to Resume().")
+
+        fitness["name"] = _ImportFunction(reference)
+
+    names = [motor["name"] for motor in meta["motors"]]
+    settings = meta["history"]
+
+    if settings["path"] is None:
+        history = FitHistory(names)
+    else:
+        history = FitHistory(names, path = settings["path"], chunkSize = settings["chunkSize"], append = True)
+        history.Truncate(settings["flushed"])
+
+    for i in range(len(arrays["history_aveFitness"])):
+        history.Append(arrays["history_aveFitness"][i, 0], arrays["history_peakFitness"][i, 0],
+                        arrays["history_peakParameters"][i])
+
+    ga = GA4Beamline(meta["motors"], meta["survivorMode"], meta["parentMode"], meta["cxMode"], meta["mutationMode"],
+                        fitness, nPop = meta["nPop"], OM = meta["OM"], history = history, **kwargs)
+
+    ga.generation = meta["generation"]
+    ga.evaluations = meta.get("evaluations", 0)
+    ga.observations = meta.get("observations", 0)
+    ga.rng.bit_generator.state = meta["rng"]
+    ga._batchFit = meta["batch"]
+
+    ga.pop.Clear()
+    ga.pop.Add(arrays["genes"], arrays["fitness"], arrays.get("objectives"), arrays.get("sigmas"))
+    ga.pop.ranking[:ga.pop.size] = arrays["ranking"]
+    ga.pop.probability[:ga.pop.size] = arrays["probability"]
+
+    if "archive_individuals" in arrays:
+        ga.archive.individuals = arrays["archive_individuals"]
+        ga.archive.objectives = arrays["archive_objectives"]
+
+    return ga
+
+class Checkpointer():
+    """
+    Saves a GA4Beamline every few generations when passed to it as checkpoint.  A history kept in memory is streamed to
+        the directory path + '.history' instead, and the history is flushed before each save, so a checkpoint only
+        records how many generations are on disk and saving stays cheap however long the run.
+
+    ...
+
+    Parameters
+    ----------
+    path : str
+        File to write.
+    every : int, optional
+        Number of generations between checkpoints (Default value is 1).
+    sync : bool, optional
+        Whether to flush each checkpoint to disk before replacing the previous one (Default value is False).
+
+    Methods
+    -------
+    Generation(ga)
+        Called by GA4Beamline after each generation; saves ga when its generation is a multiple of every.
+    """
+
+    def __init__(self, path, every = 1, sync = False):
+        self.path = path
+        self.every = every
+        self.sync = sync
+
+    def Generation(self, ga):
+        if ga.generation % self.every == 0:
+            if ga.history.path is None:
+                ga.history.Stream(f"{self.path}.history")
+
+            ga.history.Flush()
+            Save(ga, self.path, self.sync)
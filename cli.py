@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+#Runs GA4Beamline from a configuration file and reports how long it took to start.
+#
+#   python -m ga4beamlines config.json              run until the stopping conditions of the file are met
+#   python -m ga4beamlines config.toml --seed 3     override the seed of the file
+#
+#The configuration is JSON (or TOML) with the arguments of GA4Beamline and Run():
+#
+#   {"motors": [{"name": "m0", "lo": -2, "hi": 2, "sigma": 0.2}, {"name": "m1", "lo": -2, "hi": 2, "sigma": 0.2}],
+#    "survivorMode": "genitor", "parentMode": {"name": "probRank", "s": 1.5}, "cxMode": "whole",
+#    "mutationMode": "gaussian", "fitness": {"type": "Func", "function": "ackley:AckleyFunc", "batch": true},
+#    "nPop": 10, "seed": 0, "generations": 500, "target": 0.99}
+#
+#Modes are given by name or as dicts like the entries of sMode, pMode, cxMode and mMode.  'Func' fitness names its
+#   function as 'module:name'; 'epics' and 'image' fitness talk to EPICS through pyepics, or 'image' replays a frame stack
+#   ('stack', 'shape', 'dtype').  'history' streams the fitness history to a directory and 'checkpoint' ({'path', 'every'})
+#   saves the run for checkpoint.Resume().
+
+import time
+
+START = time.perf_counter()
+
+import argparse
+import json
+import sys
+import ga4beamlines as ga
+from checkpoint import Checkpointer, _ImportFunction
+from history import FitHistory
+
+IMPORTED = time.perf_counter()
+
+#Keys of the configuration passed on to GA4Beamline.Run()
+STOP = ["generations", "evaluations", "target", "stall", "diversity", "tolerance"]
+
+def LoadConfig(path):
+    """
+    Reads a JSON configuration file, or a TOML one when path ends in .toml.
+    """
+    if str(path).endswith(".toml"):
+        import tomllib
+
+        with open(path, "rb") as file:
+            return tomllib.load(file)
+
+    with open(path) as file:
+        return json.load(file)
+
+def _Mode(mode):
+    return {"name": mode} if isinstance(mode, str) else dict(mode)
+
+def _Fitness(spec, names):
+    """
+    Builds the fitness dict of GA4Beamline from its configuration entry.
+    """
+    fitness = dict(spec)
+
+    if fitness["type"] == "Func":
+        fitness["name"] = _ImportFunction(fitness.pop("function"))
+
+    elif fitness["type"] == "epics":
+        import beamline
+
+        fitness["control"] = beamline.EpicsControl(fitness.get("timeout"))
+
+    elif fitness["type"] == "image":
+        import imaging
+
+        if "stack" in fitness:
+            stack = imaging.OpenStack(fitness.pop("stack"), fitness.pop("shape", None), fitness.pop("dtype", "uint16"))
+            fitness["name"] = imaging.ReplaySource(stack, fitness.pop("loop", False))
+        else:
+            import beamline
+
+            control = beamline.EpicsControl(fitness.get("timeout"))
+            fitness["name"] = imaging.DetectorSource(control, names, fitness.pop("pv"), fitness.pop("shape"),
+                                                        fitness.get("timeout"))
+
+    return fitness
+
+def Build(config):
+    """
+    Creates the GA4Beamline described by a configuration.
+    """
+    names = [motor["name"] for motor in config["motors"]]
+    fitness = config.get("fitness", {"type": "Func", "function": "ackley:AckleyFunc", "batch": True})
+    history = FitHistory(names, path = config["history"]) if "history" in config else None
+    checkpoint = Checkpointer(**config["checkpoint"]) if "checkpoint" in config else None
+
+    return ga.GA4Beamline(config["motors"], _Mode(config["survivorMode"]), _Mode(config["parentMode"]),
+                            _Mode(config["cxMode"]), _Mode(config["mutationMode"]), _Fitness(fitness, names),
+                            nPop = config.get("nPop", 10), OM = config.get("OM", False), seed = config.get("seed"),
+                            history = history, checkpoint = checkpoint)
+
+def Main(argv = None):
+    parser = argparse.ArgumentParser(prog = "python -m ga4beamlines", description = "Runs GA4Beamline from a configuration file.")
+    parser.add_argument("config", help = "JSON or TOML configuration file")
+    parser.add_argument("--generations", type = int, help = "override the generation cap")
+    parser.add_argument("--seed", type = int, help = "override the seed")
+    parser.add_argument("--output", help = "CSV file to write the fitness history to")
+    parser.add_argument("--quiet", action = "store_true", help = "do not report timings")
+    args = parser.parse_args(argv)
+
+    config = LoadConfig(args.config)
+
+    if args.generations is not None:
+        config["generations"] = args.generations
+    if args.seed is not None:
+        config["seed"] = args.seed
+
+    algorithm = Build(config)
+    ready = time.perf_counter()
+    result = algorithm.Run(**{key: config[key] for key in STOP if key in config})
+    done = time.perf_counter()
+
+    if args.output:
+        algorithm.fitHistory.to_csv(args.output)
+
+    algorithm.history.Flush()
+
+    result["timings"] = {"import": IMPORTED - START, "startup": ready - START, "run": done - ready}
+    print(json.dumps(result))
+
+    if not args.quiet:
+        print(f"imports {result['timings']['import']:.3f} s, startup {result['timings']['startup']:.3f} s, "
+                f"run {result['timings']['run']:.3f} s", file = sys.stderr)
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(Main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+#Backends used by GA4Beamline to evaluate the fitness of a set of individuals.
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+def _EvaluateChunk(func, individuals, batch):
+    """
+    Evaluates a block of individuals.  Defined at module level so process pools can pickle it.
+
+    Parameters
+    ----------
+    func : callable
+        The fitness function.
+    individuals : numpy array
+        Motor positions with one row per individual (individuals x motors).
+    batch : bool
+        Whether func takes the whole block at once (True) or one individual as a list (False).
+    """
+    if batch:
+        return np.asarray(func(individuals), dtype = float)
+
+    return np.array([func(row.tolist()) for row in individuals], dtype = float)
+
+class Evaluator():
+    """
+    Base class for fitness evaluation backends.
+
+    ...
+
+    Methods
+    -------
+    Evaluate(func, individuals, batch)
+        Returns the fitness of each individual, in order.
+    Close()
+        Releases any workers held by the backend.
+    """
+
+    def Evaluate(self, func, individuals, batch = False):
+        """
+        Evaluates every individual with func.
+
+        Parameters
+        ----------
+        func : callable
+            The fitness function.
+        individuals : numpy array
+            Motor positions with one row per individual (individuals x motors).
+        batch : bool, optional
+            Whether func takes an (individuals x motors) array and returns a fitness vector (Default value is False).
+
+        Returns
+        -------
+        numpy array
+            The fitness of each individual in the same order as individuals, with one row per individual when func returns
+                several objectives.
+        """
+        values = self._Evaluate(func, np.asarray(individuals, dtype = float), batch)
+
+        if values.ndim not in (1, 2) or len(values) != len(individuals):
+            raise ValueError(f"Fitness function returned shape {values.shape} for {len(individuals)} individuals.")
+
+        return values
+
+    def _Evaluate(self, func, individuals, batch):
+        raise NotImplementedError
+
+    def Close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
+
+class SerialEvaluator(Evaluator):
+    """
+    Evaluates individuals one after another in the calling thread.
+    """
+
+    def _Evaluate(self, func, individuals, batch):
+        return _EvaluateChunk(func, individuals, batch)
+
+class PoolEvaluator(Evaluator):
+    """
+    Base class for backends that split the individuals into chunks and evaluate them on a pool of workers.  The pool is
+        created on first use and reused for every following generation until Close() is called.
+
+    Parameters
+    ----------
+    nWorkers : int, optional
+        Number of workers in the pool (Default value is None, which uses the number of CPUs).
+    chunkSize : int, optional
+        Number of individuals sent to a worker at once (Default value is None, which splits the individuals evenly
+            between the workers).
+    """
+
+    def __init__(self, nWorkers = None, chunkSize = None):
+        self.nWorkers = nWorkers if nWorkers is not None else (os.cpu_count() or 1)
+        self.chunkSize = chunkSize
+        self._pool = None
+
+    def _MakePool(self):
+        raise NotImplementedError
+
+    def _Evaluate(self, func, individuals, batch):
+        if len(individuals) == 0:
+            return np.zeros(0)
+
+        if self._pool is None:
+            self._pool = self._MakePool()
+
+        chunkSize = self.chunkSize or int(np.ceil(len(individuals) / self.nWorkers))
+        chunks = [individuals[i:i + chunkSize] for i in range(0, len(individuals), chunkSize)]
+
+        #map returns the results in the order the chunks were submitted
+        results = self._pool.map(_EvaluateChunk, [func] * len(chunks), chunks, [batch] * len(chunks))
+
+        return np.concatenate([np.atleast_1d(result) for result in results])
+
+    def Close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+class ThreadPoolEvaluator(PoolEvaluator):
+    """
+    Evaluates chunks of individuals on a pool of threads.  Best suited to fitness functions that release the GIL or wait
+        on I/O.
+    """
+
+    def _MakePool(self):
+        return ThreadPoolExecutor(max_workers = self.nWorkers)
+
+class ProcessPoolEvaluator(PoolEvaluator):
+    """
+    Evaluates chunks of individuals on a pool of processes.  The fitness function must be picklable (e.g. defined at
+        module level).
+    """
+
+    def _MakePool(self):
+        return ProcessPoolExecutor(max_workers = self.nWorkers)
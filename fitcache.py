@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+#Remembers the fitness of configurations that were already evaluated so repeats are not measured again.
+
+import numpy as np
+from collections import OrderedDict
+
+class FitnessCache():
+    """
+    Least recently used cache of fitness values keyed by motor positions quantized to a per-motor resolution.  Two
+        configurations whose positions round to the same multiples of the resolution share a fitness value.
+
+    ...
+
+    Parameters
+    ----------
+    resolution : float or list of float
+        Size of a quantization step for every motor, or for each motor.
+    maxSize : int, optional
+        Maximum number of configurations kept; the least recently used are evicted first (Default value is 100000).
+
+    Attributes
+    ----------
+    hits : int
+        Number of individuals whose fitness was found in the cache.
+    misses : int
+        Number of individuals whose fitness was not in the cache.
+    evaluations : int
+        Number of individuals actually evaluated.  Lower than misses when a batch holds the same configuration twice.
+
+    Methods
+    -------
+    FromMotors(motors, resolution)
+        Creates a cache using the 'resolution' of each GA4Beamline motor dict.
+    Evaluate(individuals, func)
+        Returns the fitness of each individual, calling func only for configurations not in the cache.
+    Stats()
+        Returns the counters as a dict.
+    Clear()
+        Empties the cache and resets the counters.
+    """
+
+    def __init__(self, resolution, maxSize = 100000):
+        self.resolution = np.asarray(resolution, dtype = float)
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.evaluations = 0
+
+        if np.any(self.resolution <= 0):
+            raise ValueError(f"{resolution} is not a valid resolution.")
+
+        self._values = OrderedDict()
+
+    @classmethod
+    def FromMotors(cls, motors, resolution = 1e-6, **kwargs):
+        """
+        Creates a cache from GA4Beamline motor dicts, using resolution for motors without a 'resolution' entry.
+        """
+        return cls([motor.get("resolution", resolution) for motor in motors], **kwargs)
+
+    def __len__(self):
+        return len(self._values)
+
+    def _Keys(self, individuals):
+        return np.round(np.asarray(individuals, dtype = float) / self.resolution).astype(np.int64)
+
+    def Evaluate(self, individuals, func):
+        """
+        Returns the fitness of each individual, using cached values where possible.
+
+        Parameters
+        ----------
+        individuals : numpy array
+            Motor positions with one row per individual (individuals x motors).
+        func : callable
+            Takes the individuals missing from the cache (as rows of an array) and returns their fitness.
+
+        Returns
+        -------
+        numpy array
+            The fitness of each individual, as rows when func returns several objectives.
+        """
+        keys = self._Keys(individuals)
+        found = {}
+        missing = []
+
+        for i in range(len(keys)):
+            key = keys[i].tobytes()
+
+            if key in self._values:
+                self._values.move_to_end(key)
+                found[i] = self._values[key]
+            else:
+                missing.append(i)
+
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        if len(missing) > 0:
+            missing = np.array(missing)
+
+            #Configurations repeated within the batch are only evaluated once
+            unique, first, inverse = np.unique(keys[missing], axis = 0, return_index = True, return_inverse = True)
+            measured = np.asarray(func(np.asarray(individuals)[missing[first]]), dtype = float)
+
+            #Multi-objective fitness gives a row of values per individual
+            values = np.zeros((len(keys),) + measured.shape[1:])
+            values[missing] = measured[inverse.reshape(-1)]
+            self.evaluations += len(first)
+
+            for i in range(len(unique)):
+                self._values[unique[i].tobytes()] = measured[i]
+
+            while len(self._values) > self.maxSize:
+                self._values.popitem(last = False)
+        else:
+            values = np.zeros((len(keys),) + np.shape(next(iter(found.values()), 0.0)))
+
+        for i, value in found.items():
+            values[i] = value
+
+        return values
+
+    def Stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evaluations": self.evaluations, "size": len(self._values)}
+
+    def Clear(self):
+        self._values.clear()
+        self.hits = self.misses = self.evaluations = 0
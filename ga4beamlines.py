@@ -1,31 +1,67 @@
 #!/usr/bin/env python 3
 
-print("Imported!")
+#pandas, scipy and the beamline modules (which bring in asyncio) are only imported by the features that need them, so the
+#   module starts quickly
+
+#python -m ga4beamlines hands over to the command line before anything is defined, so the module is only loaded once
+if __name__ == "__main__":
+    import sys
+    import cli
+
+    sys.exit(cli.Main())
 
-import pandas as pd
-import random
 import numpy as np
+import time
 import ackley
-from scipy.stats import truncnorm
+import selection
+import pareto
+from evaluators import SerialEvaluator
+from history import FitHistory
 
 #################### VARIABLES AND CONSTANTS DEFINITIONS ####################
 #Valid survivor selection methods
+#   nsga2 is for multi-objective fitness: it keeps the best of population + children by front and crowding distance, and
+#   stores every non-dominated configuration in an archive of at most archiveSize (None for no limit)
 sMode =     [{"name": "age", "nElite": 0},
              {"name": "genitor"},
-             {"name": "steady", "nChild": 2}]
+             {"name": "steady", "nChild": 2},
+             {"name": "nsga2", "archiveSize": None}]
 #Valid parent selection methods
+#   tournament picks the fittest of k random individuals; truncation picks at random from the best fraction
 pMode =     [{"name": "probRank", "s": 1.5},
-             {"name": "probFit"}]
+             {"name": "probFit"},
+             {"name": "tournament", "k": 2},
+             {"name": "truncation", "fraction": 0.5}]
 #Valid child generation methods
 cxMode =    [{"name": "single", "alpha": 0.5},
              {"name": "simple", "alpha": 0.75},
              {"name": "whole", "alpha": 0.75}]
 #Valid mutation methods
-mMode =     [{"name": "uniform"},
-             {"name": "gaussian"},
-             {"name": "cauchy"}]
+#   pGene is the probability of mutating each gene of a child
+#   adaptive is gaussian with step sizes carried by each individual and evolved with it, never below minStep or above
+#   the motor's range (minStep is relative to the range)
+mMode =     [{"name": "uniform", "pGene": 1.0},
+             {"name": "gaussian", "pGene": 1.0},
+             {"name": "cauchy", "pGene": 1.0},
+             {"name": "adaptive", "pGene": 1.0, "minStep": 1e-4}]
 #Valid fitness methods
-fMode =     [{"type": "Func", "name": ackley.AckleyFunc}]
+#   'batch' (optional) states whether 'name' takes every individual at once as an (individuals x motors) array and
+#   returns a fitness vector.  When it is left out, 'name' is called once per individual with a list of motor positions.
+#   'epics' reads the PV in 'name' after moving the motors with 'control' (a beamline.BeamlineControl, e.g.
+#   beamline.EpicsControl or simbeamline.SimBeamline).  'timeout' (optional) is the seconds allowed for each move.
+#   'image' computes fitness from detector frames given by the frame source in 'name' (e.g. imaging.DetectorSource or
+#   imaging.ReplaySource): 'frames' are averaged per individual, 'background' is subtracted from every pixel, and
+#   'metric' (see imaging.Score) picks the beam metrics used.
+#   'objectives' (optional, 'Func' and 'image' only) is the number of values returned for each individual; more than 1
+#   needs the nsga2 survivor mode.
+fMode =     [{"type": "Func", "name": ackley.AckleyFunc, "batch": True},
+             {"type": "epics", "name": "PV name", "control": None, "timeout": None},
+             {"type": "image", "name": None, "frames": 1, "metric": "intensity", "background": 0.0}]
+#Observer Mode parameters
+#   'period' is the seconds between samples of the motor readbacks and fitness PV during a move, and 'capacity' the number
+#   of samples the ring buffers hold.  The best average of 'window' consecutive samples replaces the destination only if
+#   it beats the destination's fitness by 'margin' times the estimated noise of a sample.
+oMode =     {"period": 0.005, "capacity": 4096, "window": 5, "margin": 3.0}
 
 #################### CLASS DEFINITIONS ####################
 ########## ERROR CLASSES ##########
@@ -40,6 +76,238 @@ class MethodError(BeamlineError):
     def __init__(self, message):
         super().__init__(message)
 
+########## POPULATION CLASS ##########
+
+class Population():
+    """
+    Array-backed storage for a set of individuals.
+
+    Individuals are kept as columns of a preallocated matrix so the stages of the algorithm can work on them without
+        building data frames.  Only the first 'size' columns of each array are in use.
+
+    Parameters
+    ----------
+    nMotors : int
+        Number of genes (motors) in each individual.
+    capacity : int
+        Maximum number of individuals that can be stored.
+    nObjectives : int, optional
+        Number of objectives stored for each individual in multi-objective mode (Default value is 0, which stores none).
+    stepSizes : bool, optional
+        Whether each individual carries its own mutation step size for each motor (Default value is False).
+
+    Attributes
+    ----------
+    genes : numpy array
+        Motor positions with one row per motor and one column per individual (nMotors x capacity).
+    fitness : numpy array
+        Fitness of each individual.
+    ranking : numpy array
+        Rank of each individual (0 being the worst).
+    probability : numpy array
+        Probability of selecting each individual as a parent.
+    objectives : numpy array or None
+        Objective values with one row per objective and one column per individual (nObjectives x capacity).  In
+            multi-objective mode, fitness holds the crowded comparison score computed from them.
+    sigmas : numpy array or None
+        Mutation step size of each gene of each individual (nMotors x capacity) for the adaptive mutation method.
+    size : int
+        Number of individuals currently stored.
+    ranked : bool
+        True while the individuals are ordered from best to worst fitness and ranking is up to date.  Cleared by any change
+            that may break the order; code writing to the arrays directly must clear it too.
+    """
+
+    def __init__(self, nMotors, capacity, nObjectives = 0, stepSizes = False):
+        self.genes = np.zeros((nMotors, capacity))
+        self.fitness = np.zeros(capacity)
+        self.ranking = np.zeros(capacity, dtype = int)
+        self.probability = np.zeros(capacity)
+        self.objectives = np.zeros((nObjectives, capacity)) if nObjectives > 0 else None
+        self.sigmas = np.zeros((nMotors, capacity)) if stepSizes else None
+        self.size = 0
+        self.ranked = True
+
+    @property
+    def capacity(self):
+        return self.genes.shape[1]
+
+    def Individuals(self):
+        """
+        Returns the motor positions in use as an (individuals x motors) view.
+        """
+        return self.genes[:, :self.size].T
+
+    def Clear(self):
+        """
+        Empties the population without releasing its storage.
+        """
+        self.size = 0
+        self.ranked = True
+
+    def Add(self, genes, fitness = None, objectives = None, sigmas = None):
+        """
+        Appends individuals to the end of the population.
+
+        Parameters
+        ----------
+        genes : numpy array
+            Motor positions of a single individual (nMotors) or of several individuals (nMotors x n).
+        fitness : numpy array, optional
+            Fitness of the new individuals (Default value is None, which sets them to 0).
+        objectives : numpy array, optional
+            Objective values of the new individuals (nObjectives x n) (Default value is None, which sets them to 0).
+        sigmas : numpy array, optional
+            Mutation step sizes of the new individuals (nMotors x n) (Default value is None, which sets them to 0).
+        """
+        genes = np.asarray(genes, dtype = float)
+
+        if genes.ndim == 1:
+            genes = genes[:, np.newaxis]
+
+        end = self.size + genes.shape[1]
+
+        if end > self.capacity:
+            raise BeamlineError(f"Cannot store {end} individuals in a population with a capacity of {self.capacity}.")
+
+        self.genes[:, self.size:end] = genes
+        self.fitness[self.size:end] = 0.0 if fitness is None else fitness
+        self.ranking[self.size:end] = 0
+        self.probability[self.size:end] = 0.0
+
+        if self.objectives is not None:
+            self.objectives[:, self.size:end] = 0.0 if objectives is None else objectives
+        if self.sigmas is not None:
+            self.sigmas[:, self.size:end] = 0.0 if sigmas is None else sigmas
+
+        self.size = end
+        self.ranked = False
+
+    def Extend(self, other, count = None):
+        """
+        Appends the first count individuals (all if None) of another population, keeping their fitness.
+        """
+        n = other.size if count is None else min(count, other.size)
+        objectives = other.objectives[:, :n] if other.objectives is not None else None
+        sigmas = other.sigmas[:, :n] if other.sigmas is not None else None
+
+        self.Add(other.genes[:, :n], other.fitness[:n], objectives, sigmas)
+
+    def Reorder(self, order):
+        """
+        Rearranges the individuals in place so that position i holds the individual previously at order[i].
+            Individuals left out of order are dropped.
+        """
+        n = len(order)
+
+        self.genes[:, :n] = self.genes[:, order]
+        self.fitness[:n] = self.fitness[order]
+        self.ranking[:n] = self.ranking[order]
+        self.probability[:n] = self.probability[order]
+
+        if self.objectives is not None:
+            self.objectives[:, :n] = self.objectives[:, order]
+        if self.sigmas is not None:
+            self.sigmas[:, :n] = self.sigmas[:, order]
+
+        self.size = n
+        self.ranked = False
+
+    def Sort(self):
+        """
+        Orders the individuals from best to worst fitness (ties keep their order) and sets their ranking.
+        """
+        if not self.ranked:
+            self.Reorder(np.argsort(-self.fitness[:self.size], kind = "stable"))
+
+        self.ranking[:self.size] = np.arange(self.size - 1, -1, -1)
+        self.ranked = True
+
+    def Merge(self, other, count = None):
+        """
+        Inserts the first count individuals (all if None) of another population into this one, keeping both ordered from
+            best to worst.  Both populations must be ranked.  Takes linear time instead of sorting the combined population.
+        """
+        if not (self.ranked and other.ranked):
+            raise BeamlineError("Only ranked populations can be merged.")
+
+        n = self.size
+        m = other.size if count is None else min(count, other.size)
+
+        if n + m > self.capacity:
+            raise BeamlineError(f"Cannot store {n + m} individuals in a population with a capacity of {self.capacity}.")
+
+        #Position of each new individual in the merged order; existing individuals stay ahead on ties
+        new = np.searchsorted(-self.fitness[:n], -other.fitness[:m], side = "right") + np.arange(m)
+        old = np.ones(n + m, dtype = bool)
+        old[new] = False
+
+        for name in ("genes", "fitness", "probability", "objectives", "sigmas"):
+            if getattr(self, name) is None:
+                continue
+
+            mine = getattr(self, name)
+            theirs = getattr(other, name)
+            kept = mine[..., :n].copy()
+
+            mine[..., :n + m][..., old] = kept
+            mine[..., :n + m][..., new] = theirs[..., :m]
+
+        self.size = n + m
+        self.ranking[:self.size] = np.arange(self.size - 1, -1, -1)
+
+    def Truncate(self, n):
+        """
+        Keeps only the first n individuals.
+        """
+        self.size = min(n, self.size)
+
+        if self.ranked:
+            self.ranking[:self.size] = np.arange(self.size - 1, -1, -1)
+
+    def ToDataFrame(self, names):
+        """
+        Builds a data frame copy of the population with a column for each motor name followed by 'fitness', 'ranking',
+            'probability', and in multi-objective mode one column per objective ('objective0', ...).
+        """
+        categories = {}
+
+        for i in range(len(names)):
+            categories[names[i]] = self.genes[i, :self.size].copy()
+
+        categories["fitness"] = self.fitness[:self.size].copy()
+        categories["ranking"] = self.ranking[:self.size].copy()
+        categories["probability"] = self.probability[:self.size].copy()
+
+        for i in range(0 if self.objectives is None else len(self.objectives)):
+            categories[f"objective{i}"] = self.objectives[i, :self.size].copy()
+
+        import pandas as pd
+
+        return pd.DataFrame(categories)
+
+    @classmethod
+    def FromDataFrame(cls, frame, nMotors, capacity, nObjectives = 0, stepSizes = False):
+        """
+        Creates a population from a data frame whose first nMotors columns are the motor positions, optionally followed by
+            'fitness', 'ranking', and 'probability' columns.
+        """
+        pop = cls(nMotors, max(capacity, len(frame.index)), nObjectives, stepSizes)
+        pop.size = len(frame.index)
+        pop.genes[:, :pop.size] = frame.iloc[:, :nMotors].to_numpy(dtype = float).T
+
+        if "fitness" in frame:
+            pop.fitness[:pop.size] = frame["fitness"].to_numpy(dtype = float)
+        if "ranking" in frame:
+            pop.ranking[:pop.size] = frame["ranking"].to_numpy(dtype = int)
+        if "probability" in frame:
+            pop.probability[:pop.size] = frame["probability"].to_numpy(dtype = float)
+
+        #The rows are in whatever order the frame had
+        pop.ranked = False
+
+        return pop
+
 ########## GA CLASS ##########
 
 class GA4Beamline():
@@ -52,17 +320,25 @@ class GA4Beamline():
     ----------
     motors : list of dict
         Contains dictionaries for each motor's transformations with their name ('name', PV name for epics motors),
-            upper limit ('hi'), lower limit ('lo'), and sigma ('sigma').
+            upper limit ('hi'), lower limit ('lo'), and sigma ('sigma').  Motors may also give their speed ('velocity'),
+            used to estimate travel time, and the smallest meaningful step ('resolution'), used to match cached fitness.
     survivorMode : dict
-        Specifies the survivor selection method ('name') and parameters ('nElite', optional).  See sMode for valid parameters.
+        Specifies the survivor selection method ('name') and parameters ('nElite' or, for steady, 'nChild', optional).  See sMode
+            for valid parameters.
     parentMode : dict
-        Parent selection method ('name') and parameters ('s', optional).  See pMode for valid parameters.
+        Parent selection method ('name') and parameters ('s', 'k' or 'fraction', optional).  See pMode for valid parameters.
     cxMode : dict
         Recombination method ('name') and parameters (kwargs: 'alpha').  See cxMode for valid parameters.
     mutationMode : dict
-        Mutation method ('name').  See mMode for valid parameters.
+        Mutation method ('name') and parameters ('pGene' and, for adaptive, 'minStep', optional).  See mMode for valid
+            parameters.
     fitness : dict
-        How to measure fitness. 'Type' is either ‘PV’ or ‘Func’ and 'name' is the either the PV or function name to be used.
+        How to measure fitness. 'Type' is either ‘epics’ or ‘Func’ and 'name' is the either the PV or function name to be used.
+            'epics' also needs the 'control' used to move the motors and read the PV.
+            'batch' (optional, 'Func' only) says whether the function evaluates all individuals in one call (Default value
+                is False).
+            'image' takes a frame source as 'name' and the 'frames', 'metric' and 'background' used to reduce its frames.
+            'objectives' (optional, 'Func' and 'image' only) is the number of objectives returned for each individual.
             See fMode for valid parameters.
     nPop : int, optional
         Number of individuals in the population (Default value is 10).
@@ -70,8 +346,32 @@ class GA4Beamline():
         Initial population; if equal to None, will create one (Default value is None).  Should have a column for each of the
             motor names in motors as well as a 'fitness', 'rank', and 'probability' column in that order.  Should have an
             index length equal to nPop.
-    OM : bool, optional
+    OM : bool or dict, optional
         Turns on Observer Mode – only set to True when using against epics motors/fitness function (Default value is False).
+            A dict turns it on with its 'period', 'capacity', 'window' and 'margin' instead of those of oMode.
+    evaluator : Evaluator, optional
+        Backend used to evaluate 'Func' fitness functions, e.g. a ThreadPoolEvaluator or ProcessPoolEvaluator from
+            evaluators (Default value is None, which evaluates serially).  The caller is responsible for closing it.
+    scheduler : TravelScheduler, optional
+        Reorders each batch of individuals before evaluation to reduce motor travel, e.g. scheduling.TravelScheduler
+            (Default value is None, which evaluates in population order).
+    cache : FitnessCache, optional
+        Returns stored fitness values for configurations already evaluated instead of evaluating them again, e.g.
+            fitcache.FitnessCache (Default value is None, which evaluates every individual).
+    seed : int, numpy SeedSequence or Generator, optional
+        Seed of the random number generator used by every stage of the algorithm (Default value is None, which seeds
+            from the operating system).
+    history : FitHistory, optional
+        Recorder for the fitness history, e.g. one streaming to disk (Default value is None, which keeps it in memory).
+    checkpoint : Checkpointer, optional
+        Saves the state of the algorithm after generations so it can be resumed with checkpoint.Resume(), e.g.
+            checkpoint.Checkpointer (Default value is None).
+    observers : list of Observer, optional
+        Notified around each stage of every generation with its timing, evaluation count, cache hits and population
+            diversity, e.g. telemetry.TelemetryCollector (Default value is None).  Stages are not timed without observers.
+    surrogate : Surrogate, optional
+        Model of the fitness learned from every evaluation.  Oversample times as many children are bred and only the most
+            promising are measured, e.g. surrogate.Surrogate (Default value is None, which measures every child).
 
     Attributes
     ----------
@@ -79,44 +379,78 @@ class GA4Beamline():
         Stores the value of motors passed in to initialize the class.
     generation : int
         Current generation of the population.
+    rng : numpy Generator
+        Source of all random numbers used by the algorithm.
     sSel : dict
-        The method ('name') and parameters ('nElite') to use for survivor selection.
+        The method ('name') and parameters ('nElite', 'nChild' for steady, and 'archiveSize' for nsga2) to use for
+            survivor selection.
     pSel : dict
-        The method ('name') and parameters ('s') to use for parent selection.
+        The method ('name') and parameters ('s', 'k' or 'fraction') to use for parent selection.
     cxMode : dict
         The method ('name') and parameters ('alpha') to use for recombination.
     mMode : dict
-        The method ('name') to use for recombination.
-    obsMode : bool
+        The method ('name') and parameters ('pGene', and 'minStep' for adaptive) to use for mutation.
+    obsMode : bool or dict
         Determines whether to use oberver mode (True) or not.  Should use only when using epics motors/fitness function.
+    observations : int
+        Number of individuals replaced by a better configuration seen while moving to them in Observer Mode.
     fitness : dict
         The type of fitness function to use ('type') and the function name ('name') to use for fitness evaluation.
+    evaluator : Evaluator
+        The backend used to evaluate 'Func' fitness functions.
+    scheduler : TravelScheduler or None
+        Chooses the order in which individuals are evaluated.  Its history holds the estimated travel time of each batch.
+    cache : FitnessCache or None
+        Stores evaluated configurations.  Its hits and misses count how many evaluations were saved.
     nPop: int
         The number of individuals in the population each generation.
     population: pandas data frame
-        Stores the current generation of motor configurations.  Has columns for each motor, overall fitness of individual,
-            the rank of the individual, and the probability of selecting it as a parent.
-    parents : list of indexes
+        The current generation of motor configurations.  Has columns for each motor, overall fitness of individual,
+            the rank of the individual, and the probability of selecting it as a parent.  Built on demand from pop.
+    parents : numpy array of indexes
         The indexes of the individuals in the population to use in child generation.
     children : pandas data frame
-        Stores the potential next generation of motor configurations.  Has columns for each motor, overall fitness of individual,
-            the rank of the individual, and the probability of selecting it as a parent.
+        The potential next generation of motor configurations.  Has columns for each motor, overall fitness of individual,
+            the rank of the individual, and the probability of selecting it as a parent.  Built on demand from kids.
+    pop : Population
+        Array storage of the current generation.  Has room for the children as well so genitor can pool them in place.
+    kids : Population
+        Array storage of the children of the current generation.
+    evaluations : int
+        Number of individuals passed to the fitness function so far (cache hits excluded).
+    observers : list of Observer
+        Notified around each stage of every generation.
+    surrogate : Surrogate or None
+        Chooses which children are measured.  Its screened count is the number of children it kept from being measured.
+    archive : ParetoArchive or None
+        Every non-dominated configuration found so far, in nsga2 mode.
     fitHistory : pandas data frame
-        Stores the average average fitness, peak fitness, and peak motor configuration for each generation.
+        The average fitness, peak fitness, and peak motor configuration for each generation.  Built on demand from history.
+            In nsga2 mode, it follows the first objective.
+    history : FitHistory
+        Columnar record of the average fitness, peak fitness, and peak motor configuration for each generation.
 
     Methods
     -------
     FirstGeneration()
         Finishes setting up and evaluating population and prepares the algorithm for multiple generations.  Must be called before NextGeneration().
     NextGeneration()
-        Progresses the algorithm forward to the next generation.  Continual iteration (and therefore termination) must be handled externally.
+        Progresses the algorithm forward to the next generation.  Continual iteration (and therefore termination) must be handled externally,
+            or by Run().
+    Run(generations, evaluations, target, stall, diversity)
+        Progresses the algorithm until a generation cap, evaluation budget, target fitness, stall, or diversity threshold is reached.
+    Diversity()
+        Returns the spread of the population relative to the motor ranges.
 
     """
 
     def __init__(self, motors, survivorMode, parentMode, cxMode, mutationMode,
-                    fitness, nPop = 10, initPop = None, OM = False):
+                    fitness, nPop = 10, initPop = None, OM = False, evaluator = None,
+                    scheduler = None, cache = None, seed = None, history = None,
+                    checkpoint = None, observers = None, surrogate = None):
 
         self.motors = motors
+        self.rng = np.random.default_rng(seed)
         self.generation = 0
         self.nPop = nPop
         self.sSel = self._VerifySurvivorMode(survivorMode)
@@ -125,33 +459,66 @@ class GA4Beamline():
         self.mMode = self._VerifyMMode(mutationMode)
         self.obsMode = OM
         self.fitness = fitness
+        self._batchFit = bool(fitness.get("batch", False))
+        self.evaluator = evaluator if evaluator is not None else SerialEvaluator()
+        self.scheduler = scheduler
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.observers = list(observers) if observers is not None else []
+        self.surrogate = surrogate
+        self.evaluations = 0
+        self.observations = 0
+        self._beamTimes = {}
+        self._observe = self._VerifyOM(OM, fitness)
+        self._transits = {}
+        self._nObjectives = self._VerifyObjectives(fitness)
+        self.archive = pareto.ParetoArchive(self.sSel["archiveSize"]) if self.sSel["name"] == "nsga2" else None
+
+        #Every pair of parents produces 2 children, of which steady state only keeps nChild
+        nChildren = 2 * int(np.ceil((self.nPop - self.sSel["nElite"]) / 2))
+        self._nChildren = self.sSel["nChild"] if self.sSel["name"] == "steady" else nChildren
+        self._oversample = surrogate.oversample if surrogate is not None else 1
+        self._stepSizes = self.mMode["name"] == "adaptive"
+        self.kids = Population(len(self.motors), nChildren * self._oversample, self._nObjectives, self._stepSizes)
 
         if initPop is None:
-            self.population = self._CreatePop()
+            self.pop = self._CreatePop()
         else:
             self.population = initPop
 
         self.parents = []
-        self.children = pd.DataFrame(self._MakeDataFrameCat())
-        self.fitHistory = pd.DataFrame({"aveFitness": [], "peakFitness": [], "peakParameters": []})
+        self.history = history if history is not None else FitHistory(self._MotorNames())
+
+    @property
+    def population(self):
+        return self.pop.ToDataFrame(self._MotorNames())
+
+    @population.setter
+    def population(self, frame):
+        self.pop = Population.FromDataFrame(frame, len(self.motors), self.nPop + self._nChildren, self._nObjectives,
+                                            self._stepSizes)
+
+        if self._stepSizes:
+            self.pop.sigmas[:, :self.pop.size] = self._MotorSigmas()[:, np.newaxis]
+
+    @property
+    def fitHistory(self):
+        return self.history.ToDataFrame()
+
+    @property
+    def children(self):
+        return self.kids.ToDataFrame(self._MotorNames())
 
     def _CreatePop(self):
         """
         Initializes population if none was provided.
         """
-        categories = {}
+        population = Population(len(self.motors), self.nPop + self._nChildren, self._nObjectives, self._stepSizes)
+        lo, hi = self._MotorLimits()
 
-        for motor in self.motors:
-            categories[motor["name"]] = []
-
-            for i in range(self.nPop):
-                categories[motor["name"]].append(random.uniform(motor["lo"], motor["hi"]))
-
-        categories["fitness"] = np.zeros(self.nPop)
-        categories["ranking"] = [0] * self.nPop
-        categories["probability"] = np.zeros(self.nPop)
-
-        population = pd.DataFrame(categories)
+        #Adaptive step sizes start from each motor's sigma
+        population.Add(self.rng.uniform(lo[:, np.newaxis], hi[:, np.newaxis], size = (len(self.motors), self.nPop)),
+                        sigmas = self._MotorSigmas()[:, np.newaxis] if self._stepSizes else None)
 
         return population
 
@@ -159,18 +526,151 @@ class GA4Beamline():
         """
         Primes the algorithm.  MUST be run before NextGeneration().
         """
-        self._Measure(childrenOnly = False)
-        self._SurvivorSel()
+        self._RunStages([("_Measure", lambda: self._Measure(childrenOnly = False)),
+                            ("_SurvivorSel", self._SurvivorSel)])
 
     def NextGeneration(self):
         """
-        Progresses the algorithm.  NOTE: Continual calls and termination must be handled externally.
+        Progresses the algorithm.  NOTE: Continual calls and termination must be handled externally or by Run().
+        """
+        stages = [("_ParentSel", self._ParentSel),
+                    ("_Recombine", self._Recombine),
+                    ("_Mutate", self._Mutate),
+                    ("_Measure", self._Measure),
+                    ("_SurvivorSel", self._SurvivorSel)]
+
+        if self.surrogate is not None:
+            stages.insert(3, ("_Screen", self._Screen))
+
+        self._RunStages(stages)
+
+    def Run(self, generations = None, evaluations = None, target = None, stall = None, diversity = None, tolerance = 0.0):
+        """
+        Runs generations until one of the given stopping conditions is met.  Calls FirstGeneration() if it has not been
+            run yet.  At least one condition must be given.
+
+        Parameters
+        ----------
+        generations : int, optional
+            Stop once NextGeneration() has run this many times in total (Default value is None).
+        evaluations : int, optional
+            Stop before a generation that could take the number of evaluations over this budget (Default value is None).
+        target : float, optional
+            Stop once the peak fitness reaches this value (Default value is None).  In nsga2 mode, the peak fitness is
+                that of the first objective, as in the history.
+        stall : int, optional
+            Stop once the peak fitness has not improved by more than tolerance for this many generations (Default value
+                is None).
+        diversity : float, optional
+            Stop once Diversity() falls below this value (Default value is None).
+        tolerance : float, optional
+            Smallest peak fitness gain counted as an improvement for stall (Default value is 0.0).
+
+        Returns
+        -------
+        dict
+            Why the run stopped ('reason': 'generations', 'evaluations', 'target', 'stall' or 'diversity'), the generation
+                and evaluation counts, and the peak fitness and motor configuration.
+        """
+        if generations is None and evaluations is None and target is None and stall is None and diversity is None:
+            raise ValueError("Run() needs at least one stopping condition.")
+
+        if self.generation == 0:
+            self.FirstGeneration()
+
+        #Every generation evaluates at most one batch of children
+        perGeneration = self._nChildren
+        best = self._Performance().max()
+        sinceImproved = 0
+        reason = None
+
+        while reason is None:
+            peak = self._Performance().max()
+
+            if peak > best + tolerance:
+                best = peak
+                sinceImproved = 0
+
+            if target is not None and peak >= target:
+                reason = "target"
+            elif generations is not None and self.generation - 1 >= generations:
+                reason = "generations"
+            elif evaluations is not None and self.evaluations + perGeneration > evaluations:
+                reason = "evaluations"
+            elif stall is not None and sinceImproved >= stall:
+                reason = "stall"
+            elif diversity is not None and self.Diversity() < diversity:
+                reason = "diversity"
+            else:
+                self.NextGeneration()
+                sinceImproved += 1
+
+        fitness = self._Performance()
+        peak = int(np.argmax(fitness))
+
+        return {"reason": reason, "generation": self.generation, "evaluations": self.evaluations,
+                "peakFitness": float(fitness[peak]), "peakParameters": self.pop.genes[:, peak].tolist()}
+
+    def Diversity(self):
+        """
+        Returns the spread of the population: the mean over motors of the standard deviation of the motor positions,
+            relative to each motor's range.
+        """
+        lo, hi = self._MotorLimits()
+        spread = np.std(self.pop.genes[:, :self.pop.size], axis = 1) / np.where(hi > lo, hi - lo, 1.0)
+
+        return float(np.mean(spread))
+
+    def _RunStages(self, stages):
+        """
+        Runs the (name, function) pairs of a generation in order, then saves a checkpoint if needed.
         """
-        self._ParentSel()
-        self._Recombine()
-        self._Mutate()
-        self._Measure()
-        self._SurvivorSel()
+        if len(self.observers) == 0:
+            for name, stage in stages:
+                stage()
+        else:
+            self._ObservedStages(stages)
+
+        self._Checkpoint()
+
+    def _ObservedStages(self, stages):
+        """
+        Runs the stages of a generation while timing them and notifying the observers.
+        """
+        evaluations = self.evaluations
+        cache = self.cache.Stats() if self.cache is not None else {"hits": 0, "misses": 0}
+        beamTimes = dict(self._beamTimes)
+        record = {}
+        start = time.perf_counter()
+
+        for name, stage in stages:
+            for observer in self.observers:
+                observer.StageStart(self, name)
+
+            stageStart = time.perf_counter()
+            stage()
+            record[name] = time.perf_counter() - stageStart
+
+            for observer in self.observers:
+                observer.StageEnd(self, name, record[name])
+
+        fitness = self._Performance()
+        now = self.cache.Stats() if self.cache is not None else cache
+
+        record.update({"generation": self.generation, "seconds": time.perf_counter() - start,
+                        "evaluations": self.evaluations - evaluations,
+                        "cacheHits": now["hits"] - cache["hits"], "cacheMisses": now["misses"] - cache["misses"],
+                        "moveTime": self._beamTimes.get("move", 0.0) - beamTimes.get("move", 0.0),
+                        "readTime": self._beamTimes.get("read", 0.0) - beamTimes.get("read", 0.0),
+                        "diversity": self.Diversity(),
+                        "aveFitness": float(fitness.mean()), "peakFitness": float(fitness.max())})
+
+        for observer in self.observers:
+            observer.GenerationEnd(self, record)
+
+    def _Checkpoint(self):
+        if self.checkpoint is not None:
+            self.checkpoint.Generation(self)
 
     #################### STAGES FUNCTIONS ####################
 
@@ -178,36 +678,72 @@ class GA4Beamline():
         """
         Determines which individuals are carried over into the next generation.
         """
-        tmp = None
-
         if self.generation == 0:
             self.generation += 1
+
+            if self.sSel["name"] == "nsga2":
+                self._ParetoSel(self.pop)
         else:
             self.generation += 1
 
+            #Population is still ranked from parent selection and children are sorted by _Measure
             if self.sSel["name"] == "age":
-                if self.sSel["nElite"] > 0:
-                    self.population = self.population.iloc[0:self.sSel["nElite"], :]
-                    #print(f"Copied elite.  public is:\n{self.population}")
-
-                    self.population = pd.concat([self.population, self.children.iloc[:(self.nPop - self.sSel["nElite"]), :]], ignore_index = True)
-                    #print(f"Combined old and new.  public is:\n{self.population}")
-                else:
-                    self.population = self.children.iloc[:self.nPop, :]
+                self.pop.Truncate(self.sSel["nElite"])
+                self.pop.Merge(self.kids, self.nPop - self.sSel["nElite"])
 
             elif self.sSel["name"] == "genitor":
-                self.population = pd.concat([self.population, self.children], ignore_index = True)
+                #Only the best nPop of population + children are needed, which a merge of the two sorted sets gives directly
+                self.pop.Merge(self.kids)
+                self.pop.Truncate(self.nPop)
+
+            elif self.sSel["name"] == "steady":
+                self._ReplaceWorst()
+
+            elif self.sSel["name"] == "nsga2":
+                self.pop.Extend(self.kids)
+                self._ParetoSel(self.kids)
+
+        #Update history
+        fitness = self._Performance()
+        peak = np.argmax(fitness)
+
+        self.history.Append(fitness.mean(), fitness[peak], self.pop.genes[:, peak])
+
+    def _Performance(self):
+        #Fitness of the population as recorded in the history: in nsga2 mode pop.fitness holds the crowded comparison
+        #   score, so the first objective is used instead
+        if self.pop.objectives is not None:
+            return self.pop.objectives[0, :self.pop.size]
+
+        return self.pop.fitness[:self.pop.size]
 
-                #Use rankPop to set rank column of population + children
-                self._RankPop()
+    def _ParetoSel(self, newcomers):
+        """
+        Keeps the best nPop individuals by non-dominated front and then crowding distance, and adds the newly evaluated
+            individuals to the archive.
+
+        Parameters
+        ----------
+        newcomers : Population
+            The individuals evaluated this generation.
+        """
+        self.archive.Update(newcomers.Individuals(), newcomers.objectives[:, :newcomers.size].T)
 
-                self.population = self.population.iloc[0:self.nPop, :]
+        #The crowded comparison score orders the population like NSGA-II, so every parent selection method can use it
+        self.pop.fitness[:self.pop.size] = pareto.CrowdedScore(self.pop.objectives[:, :self.pop.size].T)
+        self.pop.ranked = False
+        self.pop.Sort()
+        self.pop.Truncate(self.nPop)
 
-        #Update fitHistory
-        tmp = pd.DataFrame({"aveFitness": [self.population["fitness"].mean()],
-                            "peakFitness": [self.population["fitness"].max()],
-                            "peakParameters": [self.population.iloc[0, : len(self.motors)].tolist()]})
-        self.fitHistory = pd.concat([self.fitHistory, tmp], ignore_index = True)
+    def _ReplaceWorst(self):
+        """
+        Replaces the worst individuals of the population with the children, leaving the rest of the population untouched.
+        """
+        #Parent selection leaves the population sorted (Sort() does nothing then), so the worst individuals are the last
+        #   ones and the children can be merged in
+        self.pop.Sort()
+        self.pop.Truncate(self.pop.size - self.kids.size)
+        self.pop.Merge(self.kids)
 
     def _ParentSel(self):
         """
@@ -216,13 +752,22 @@ class GA4Beamline():
         #Use rankPop to set rank column
         self._RankPop()
 
+        numParents = self.nPop - self.sSel["nElite"]
+        fitness = self.pop.fitness[:self.pop.size]
+
         if self.pSel["name"] == "probRank":
             self._CalcProb("rank")
+            self.parents = self._StochasticUnivSampling(numParents)
 
         elif self.pSel["name"] == "probFit":
             self._CalcProb("fitness")
+            self.parents = self._StochasticUnivSampling(numParents)
 
-        self.parents = self._StochasticUnivSampling(numParents = self.nPop - self.sSel["nElite"])
+        elif self.pSel["name"] == "tournament":
+            self.parents = selection.Tournament(fitness, numParents, self.pSel["k"], self.rng)
+
+        elif self.pSel["name"] == "truncation":
+            self.parents = selection.Truncation(fitness, numParents, self.pSel["fraction"], self.rng)
 
         #print(f"parents has a length of: {len(self.parents)} and is:\n{self.parents}")
 
@@ -235,246 +780,336 @@ class GA4Beamline():
         numParents : int
             The number of individuals to add to the parent pool.
         """
-        cmlProb = self.population["probability"].cumsum().tolist()
-        parents = []
-
-        #print(cmlProb)
-
-        currMember = i = 0
-        r = random.uniform(0, 1 / numParents)
-
-        #print(f"r is: {r}")
-
-        while currMember < numParents:
-            while r <= cmlProb[i] and currMember < numParents:
-                parents.append(i)
-                r += 1 / numParents
-                #print(f"r is: {r}")
-                currMember += 1
-
-            i += 1
-
-        #print(f"The parents are:\n{parents}")
-        return parents
-
+        return selection.StochasticUniversalSampling(self.pop.probability[:self.pop.size], numParents, self.rng)
 
     def _Recombine(self):
         """
         Generates new motor configurations ('children') from the individuals in parents.
         """
-        self.children = pd.DataFrame(self._MakeDataFrameCat())
-        #print(f"children is:\n{self.children}")
+        self.kids.Clear()
 
-        pairs = self._CreatePairs(self.parents)
+        #With a surrogate, every parent takes part in oversample times as many pairs
+        pairs = self._CreatePairs(np.tile(self.parents, self._oversample))
 
-        for p in range(len(pairs)):
-            self.children = pd.concat([self.children, self._Recombination(pairs[p], self.cxMode)], ignore_index = True)
-            #print([self.children, self.Recombination(pairs[p], self.cxMode)])
-        #print(f"\nchildren is:\n{self.children}")
+        children = self._Recombination(pairs, self.cxMode)
+
+        #Step sizes are recombined with the genes they belong to
+        if self._stepSizes:
+            self.kids.Add(children[:len(self.motors)], sigmas = children[len(self.motors):])
+        else:
+            self.kids.Add(children)
+
+        #Steady state only pays for the evaluation of nChild children
+        if self.sSel["name"] == "steady":
+            self.kids.Truncate(self._nChildren * self._oversample)
 
     def _CreatePairs(self, parents):
         """
-        Creates a list of randomly selected pairs of parents.
+        Creates an array of randomly selected pairs of parents.
 
         Parameters
         ----------
         parents : list of indexes
             The pool of potential parents in population.
+
+        Returns
+        -------
+        numpy array
+            Population indexes of the two parents of each pair (pairs x 2).  The two parents of a pair are always different
+                entries of the pool.
         """
-        pairs = []
+        parents = np.asarray(parents, dtype = int)
+        nPairs = int(np.ceil(len(parents) / 2))
 
-        for i in range(int(np.ceil(len(parents) / 2))):
-            pairs.append(random.sample(parents, 2))
+        first = self.rng.integers(0, len(parents), size = nPairs)
 
-        #print(f"The pairs are:\n{pairs}")
+        #Offsetting by 1 to n - 1 entries picks a second parent uniformly among the others
+        if len(parents) > 1:
+            second = (first + self.rng.integers(1, len(parents), size = nPairs)) % len(parents)
+        else:
+            second = first
 
-        return pairs
+        return np.stack([parents[first], parents[second]], axis = 1)
 
-    def _Recombination(self, parents, mode):
+    def _Recombination(self, pairs, mode):
         """
         Generates 2 children from each pair of parents using the method specified in mode.
 
         Parameters
         ----------
-        parents : list of indexes
-            Contains 2 individuals from population that will be used to generate new motor configurations.
+        pairs : numpy array
+            Population indexes of the two parents of each pair (pairs x 2).
         mode : dict
             Specifies the method and parameters to use to generate the new motor configurations.
 
+        Returns
+        -------
+        numpy array
+            The motor positions of the children as columns (nMotors x 2 * pairs), followed by their step sizes (another
+                nMotors rows) for the adaptive mutation method.  The children of a pair are next to each other.
         """
         alpha = mode["alpha"]
-        parent1 = self.population.iloc[parents[0], :].tolist()
-        parent2 = self.population.iloc[parents[1], :].tolist()
-        child1 = None
-        child2 = None
+        values = self.pop.genes if not self._stepSizes else np.concatenate([self.pop.genes, self.pop.sigmas])
+        parent1 = values[:, pairs[:, 0]]
+        parent2 = values[:, pairs[:, 1]]
 
-        #print(f"parent1 is: {parent1}\nparent2 is: {parent2}\n")
-
-        #pick a random allele (k)
-        #NOTE: DOING THIS SINCE THE MOTORS ARE THE FIRST COLUMNS IN THE POPULATION DATATABLE.  IF THIS IS CHANGED,
-        #       THEN THE METHOD TO GENERATE K NEEDS TO CHANGE.
-        k = int(random.choice(range(len(self.motors))))
-        #print(f"k is: {k}")
+        #pick a random allele (k) for each pair and mark the genes that are crossed over
+        k = self.rng.integers(0, len(self.motors), size = len(pairs))
+        allele = (np.arange(len(values)) % len(self.motors))[:, np.newaxis]
 
         if mode["name"] == "single":
-            #print(f"Parent1[k] is: {parent1[k]}\nParent2[k] is: {parent2[k]}")
-            child1 = parent1[0:k]
-            child1.append(parent1[k] * (1.0 - alpha) + parent2[k] * alpha)
-            child1 = child1 + parent1[k + 1:]
-
-            child2 = parent2[0:k]
-            child2.append(parent2[k] * (1.0 - alpha) + parent1[k] * alpha)
-            child2 = child2 + parent2[k + 1:]
-
+            mask = allele == k
         elif mode["name"] == "simple":
-            #print(f"Parent1[k:] is: {parent1[k:]}\nParent2[k:] is: {parent2[k:]}")
-            child1 = parent1[0:k]
-            child1 = child1 + np.add(np.multiply(parent1[k:], 1 - alpha), np.multiply(parent2[k:], alpha)).tolist()
-
-            child2 = parent2[0:k]
-            child2 = child2 + np.add(np.multiply(parent2[k:], 1 - alpha), np.multiply(parent1[k:], alpha)).tolist()
+            mask = allele >= k
+        else:
+            mask = np.ones(parent1.shape, dtype = bool)
 
-        elif mode["name"] == "whole":
-            child1 = np.add(np.multiply(parent1, 1 - alpha), np.multiply(parent2, alpha)).tolist()
+        child1 = np.where(mask, parent1 * (1.0 - alpha) + parent2 * alpha, parent1)
+        child2 = np.where(mask, parent2 * (1.0 - alpha) + parent1 * alpha, parent2)
 
-            child2 = np.add(np.multiply(parent2, 1 - alpha), np.multiply(parent1, alpha)).tolist()
+        return np.stack([child1, child2], axis = 2).reshape(len(values), -1)
 
-        #print(f"{child1}\n\n")
 
-        tmp = self._MakeDataFrameCat()
-        i = 0
+    def _Mutate(self):
+        """
+        Causes changes in the values of the individuals in children based on the method specified in mMode.  Each gene is
+            resampled with probability mMode['pGene'] and every resampled gene is drawn in a single batch.
+        """
+        genes = self.kids.genes[:, :self.kids.size]
+        lo, hi = self._MotorLimits()
+        sigma = self._MotorSigmas()
 
-        for column in tmp:
-            tmp[column].append(child1[i])
-            tmp[column].append(child2[i])
-            i += 1
+        if self.mMode["pGene"] < 1.0:
+            mask = self.rng.random(genes.shape) < self.mMode["pGene"]
+        else:
+            mask = np.ones(genes.shape, dtype = bool)
 
-        tmp = pd.DataFrame(tmp)
-        #print(f"\ntmp is:\n{tmp}")
+        #Row index of each selected gene gives the motor its limits and sigma come from
+        motor = np.nonzero(mask)[0]
 
-        return tmp
+        if self._stepSizes:
+            sigmas = self._AdaptSteps(self.kids.sigmas[:, :self.kids.size], lo, hi)
+            genes[mask] = self._Mutation(genes[mask], lo[motor], hi[motor], sigmas[mask], "gaussian")
+            return
 
+        genes[mask] = self._Mutation(genes[mask], lo[motor], hi[motor], sigma[motor], self.mMode["name"])
 
-    def _Mutate(self):
+    def _AdaptSteps(self, sigmas, lo, hi):
         """
-        Causes changes in the values of the individuals in children based on the method specified in mMode.
+        Updates the step sizes of the children in place with the log-normal rule of evolution strategies: every step size
+            of a child is scaled by a factor shared by the whole child and one of its own.
+
+        Parameters
+        ----------
+        sigmas : numpy array
+            Step sizes of the children (nMotors x children).
+        lo : numpy array
+            Lower limit of each motor.
+        hi : numpy array
+            Upper limit of each motor.
+
+        Returns
+        -------
+        numpy array
+            The updated step sizes, between minStep times and once each motor's range.
         """
-        for row in self.children.index:
-            child = self.children.loc[row, :].tolist()
-            self.children.loc[row, :] = self._Mutation(child, self.motors, self.mMode["name"])
+        n = len(self.motors)
+        tauShared = 1 / np.sqrt(2 * n)
+        tauOwn = 1 / np.sqrt(2 * np.sqrt(n))
+        shared = self.rng.standard_normal(sigmas.shape[1])
+        own = self.rng.standard_normal(sigmas.shape)
+        span = (hi - lo)[:, np.newaxis]
 
-    def _Mutation(self, child, motors, mode):
+        sigmas *= np.exp(tauShared * shared + tauOwn * own)
+        np.clip(sigmas, self.mMode["minStep"] * span, span, out = sigmas)
+
+        return sigmas
+
+    def _Mutation(self, values, lo, hi, sigma, mode):
         """
-        Makes changes in the values of the child based on the method specified in mMode.
+        Draws new values for a set of genes based on the method specified in mMode.
 
         Parameters
         ----------
-        child : list
-            The values of a particular row in the children data frame converted into a list.
-        motors : list of dict
-
+        values : numpy array
+            The current values of the genes to mutate.
+        lo : numpy array
+            Lower limit of the motor of each gene.
+        hi : numpy array
+            Upper limit of the motor of each gene.
+        sigma : numpy array
+            Sigma of the motor of each gene.
+        mode : str
+            The mutation method to use.
+
+        Returns
+        -------
+        numpy array
+            The mutated values, all within [lo, hi].
         """
-        #print(f"Before mutation, child is:\n{child}")
+        if mode == "gaussian":
+            from scipy.stats import truncnorm
 
-        mutatedValue = []
+            #Set the limits in terms of standard deviations from the current values
+            a = (lo - values) / sigma
+            b = (hi - values) / sigma
 
-        for i in range(len(motors)):
-            #print(f"Motor is: {motors[i]['name']}\nRange is: ({motors[i]['lo']}, {motors[i]['hi']})")
-            #print(f"Original value is: {child[i]}")
-            if mode == "gaussian":
-                #Set low end in terms of standard deviations from current value
-                a = (motors[i]['lo'] - child[i])/motors[i]['sigma']
-                #Set high end in terms of standard deviations from current value
-                b = (motors[i]['hi'] - child[i])/motors[i]['sigma']
+            return truncnorm.rvs(a, b, loc = values, scale = sigma, size = values.shape, random_state = self.rng)
 
-                mutatedValue.append(truncnorm.rvs(a, b, loc = child[i], scale = motors[i]['sigma'], size=1)[0])
+        elif mode == "uniform":
+            return self.rng.uniform(lo, hi, size = values.shape)
 
-            elif mode == "uniform":
-                mutatedValue.append(random.uniform(motors[i]["lo"], motors[i]["hi"]))
-            #print(f"New mutated value is: {mutatedValue[i]}")
+        elif mode == "cauchy":
+            #Inverse transform sampling of a Cauchy distribution centered on the current values, truncated to [lo, hi]
+            cdfLo = 0.5 + np.arctan((lo - values) / sigma) / np.pi
+            cdfHi = 0.5 + np.arctan((hi - values) / sigma) / np.pi
+            u = self.rng.uniform(cdfLo, cdfHi, size = values.shape)
 
-        mutatedValue = mutatedValue + child[len(motors):]
-        #print(f"After mutation, child is:\n{mutatedValue}\n")
+            return np.clip(values + sigma * np.tan(np.pi * (u - 0.5)), lo, hi)
 
-        return mutatedValue
+        return values
+
+    def _Screen(self):
+        """
+        Keeps the children the surrogate predicts to be the most promising, enough for one generation.
+        """
+        keep = self.surrogate.Screen(self.kids.Individuals(), self._nChildren)
+
+        self.kids.Reorder(keep)
 
     def _FitnessFunc(self, pop):
-        #NOTE: WILL FINISH LATER
-        tmpFit = []
+        """
+        Fills in the fitness of every individual of pop in place, using the cache when there is one.
+        """
+        if pop.size == 0:
+            return
+
+        if self.cache is None:
+            values = self._ScheduledEvaluate(pop.Individuals())
+        else:
+            values = self.cache.Evaluate(pop.Individuals(), self._ScheduledEvaluate)
+
+        if pop.objectives is not None:
+            pop.objectives[:, :pop.size] = values.T
+        else:
+            pop.fitness[:pop.size] = values
+
+        if len(self._transits) > 0:
+            self._Substitute(pop)
+
+    def _Substitute(self, pop):
+        """
+        Replaces the individuals of pop for which Observer Mode saw a better configuration while moving to them with that
+            configuration and its fitness.  The surrogate, if any, also learns from them.
+        """
+        lo, hi = self._MotorLimits()
+        points = []
+        values = []
+
+        #In nsga2 mode the measured values are held as the (single) objective
+        measured = pop.objectives[0] if pop.objectives is not None else pop.fitness
+
+        for i in range(pop.size):
+            transit = self._transits.get(pop.genes[:, i].tobytes())
+
+            if transit is not None and transit[1] > measured[i]:
+                pop.genes[:, i] = np.clip(transit[0], lo, hi)
+                measured[i] = transit[1]
+                points.append(pop.genes[:, i].copy())
+                values.append(transit[1])
+
+        self._transits.clear()
+        self.observations += len(values)
+        pop.ranked = False
+
+        if self.surrogate is not None and len(values) > 0:
+            self.surrogate.Update(np.array(points), np.array(values))
+
+    def _ScheduledEvaluate(self, individuals):
+        """
+        Returns the fitness of each row of individuals.  With a scheduler, the individuals are evaluated in the order it
+            returns.  The results are passed on to the surrogate if there is one.
+        """
+        if self.scheduler is None:
+            values = self._Evaluate(individuals)
+        else:
+            order = self.scheduler.Schedule(individuals)
+            measured = self._Evaluate(individuals[order])
+            values = np.empty_like(measured)
+            values[order] = measured
+
+        if self.surrogate is not None:
+            self.surrogate.Update(individuals, values)
+
+        return values
+
+    def _Evaluate(self, individuals):
+        """
+        Returns the fitness of each row of individuals (individuals x motors), evaluated in that order.
+        """
+        self.evaluations += len(individuals)
 
         if self.fitness["type"] == "epics":
-            pass
-            '''
-            will implement code later but it would look like the following:
-
-            for p in population: # does for loop create unattached copy of range values?
-                move motors to p[motor] values
-                if not OM:
-                    wait for motor move to complete
-                else:# implement Observer mode
-
-                 p[‘fitness’] = read fitness[‘pv’]
-            '''
+            import beamline
+
+        if self.fitness["type"] == "epics" and self._observe is not None:
+            values, points, observed = beamline.Observe(self.fitness["control"], self._MotorNames(), individuals,
+                                                        self.fitness["name"], timeout = self.fitness.get("timeout"),
+                                                        timings = self._beamTimes, **self._observe)
+
+            #Better configurations seen on the way replace their destination once the fitness is filled in
+            for i in np.flatnonzero(observed > values):
+                self._transits[individuals[i].tobytes()] = (points[i], observed[i])
+
+            return values
+
+        elif self.fitness["type"] == "epics":
+            return beamline.Measure(self.fitness["control"], self._MotorNames(), individuals, self.fitness["name"],
+                                        timeout = self.fitness.get("timeout"), timings = self._beamTimes)
+
         elif self.fitness["type"] == "Func":
-            for row in range(len(pop.index)):
-                value = pop.iloc[row, :len(self.motors)].tolist()
-                value = self.fitness["name"](value)
-                tmpFit.append(value)
+            return self.evaluator.Evaluate(self.fitness["name"], individuals, self._batchFit)
 
-            #print(f"tmpFit is:\n{tmpFit}")
-            pop["fitness"] = tmpFit
-            #print(f"\npopulation is:\n{self.population}")
+        elif self.fitness["type"] == "image":
+            import imaging
 
-        #print(pop)
-        #returns population but with the fitness values filled in
+            return imaging.Evaluate(self.fitness["name"], individuals, self.fitness.get("frames", 1),
+                                    self.fitness.get("metric", "intensity"), self.fitness.get("background", 0.0))
 
-    def _RankPop(self):
-        #NOTE: Need to verify functionality
+        raise MethodError(message = f"{self.fitness['type']} is not a valid fitness type.")
 
-        #Set the ranking column of the self.population dataframe (1 being the highest for descending = True)
-        self.population = self.population.sort_values(by = ["fitness"], ascending = False)
-        self.population["ranking"] = [i for i in range(len(self.population.index) - 1, -1, -1)]
-        self.population.index = [i for i in range(len(self.population.index))]
-        #print(self.population)
+    def _RankPop(self):
+        #Sort the population by fitness and set the ranking (nPop - 1 being the best, 0 the worst).  Survivor selection keeps
+        #   the population sorted, so this only sorts after the population was changed some other way.
+        self.pop.Sort()
 
     def _CalcProb(self, probMode):
-        #NOTE: WILL FINISH LATER.  Need to implement "rank"
-        probs = []
+        fitness = self.pop.fitness[:self.pop.size]
 
-        #Set the probability column in the self.population dataframe
+        #Set the probability of each individual in the population
         if probMode == "rank":
-            #Loop through population and set probability using RankingProb
-            for row in self.population.index:
-                probs.append(self._RankingProb(self.population.loc[row, "ranking"], self.nPop, self.pSel['s']))
+            probs = self._RankingProb(self.pop.ranking[:self.pop.size], self.nPop, self.pSel['s'])
 
         elif probMode == "fitness":
-            #Get sum of Fitness
-            cmltFitness = self.population["fitness"].sum()
-            #print(f"cumulative fitness is: {cmltFitness}")
-            #Loop through population and set probability column to individual fitness/cumulative fitness
-            for row in self.population.index:
-                probs.append(self.population.loc[row, "fitness"] / cmltFitness)
+            probs = selection.FitnessProbabilities(fitness)
 
         #print(f"probs sum is: {np.sum(probs)}")
 
-        self.population["probability"] = probs
-        #print(self.population)
+        self.pop.probability[:self.pop.size] = probs
 
 
     def _RankingProb(self, rank, nPop, s):
-        return (2 - s) / nPop + 2 * rank * (s - 1) / nPop / (nPop - 1)
+        return selection.RankingProbabilities(rank, nPop, s)
 
     def _Measure(self, childrenOnly = True):
-        #NOTE: Need to verify functionality
-
-        #SINCE FITNESSFUNC IS SUPPOSED TO RETURN A MODIFIED POPULATION, I SHOULD PROBABLY SET SOMETHING EQUAL TO THESE
         if childrenOnly:
-            self._FitnessFunc(self.children)
-            self.children = self.children.sort_values(by = ["fitness"], ascending = False)
-            self.children.index = [i for i in range(len(self.children.index))]
+            self._FitnessFunc(self.kids)
+            self.kids.ranked = False
+            self.kids.Sort()
 
         else:
-            self._FitnessFunc(self.population)
+            self._FitnessFunc(self.pop)
+            self.pop.ranked = False
 
     #################### INITIALIZATION HELPER FUNCTIONS ####################
 
@@ -484,7 +1119,7 @@ class GA4Beamline():
             Ensure that valid values have been passed in for determining the survivor selection method.
 
         # Parameters:
-            # survivorMode  : Survivor selection method (name: Age, progRank, probFit) and parameters (nElite optional)
+            # survivorMode  : Survivor selection method (name: age, genitor, steady) and parameters (nElite or nChild optional)
         '''
         valid = False
         tmpDict = {}
@@ -500,15 +1135,23 @@ class GA4Beamline():
                     else:
                         raise ValueError(f"{survivorMode['nElite']} is out of range [0, population size).")
 
-                elif "nChild" in survivorMode:
-                    if 0 < survivorMode["nChild"] and survivorMode["nChild"] < self.nPop:
-                        tmpDict["nElite"] = self.nPop - survivorMode['nChild']
+                elif "nChild" in survivorMode or "nChild" in dictn:
+                    nChild = survivorMode.get("nChild", dictn.get("nChild"))
+
+                    if 0 < nChild and nChild < self.nPop:
+                        tmpDict["nElite"] = self.nPop - nChild
                     else:
-                        raise ValueError(f"{survivorMode['nChild']} is out of range (0, population size).")
+                        raise ValueError(f"{nChild} is out of range (0, population size).")
 
                 else:
                     tmpDict["nElite"] = 0
 
+                if tmpDict["name"] == "steady":
+                    tmpDict["nChild"] = self.nPop - tmpDict["nElite"]
+
+                if tmpDict["name"] == "nsga2":
+                    tmpDict["archiveSize"] = survivorMode.get("archiveSize", dictn["archiveSize"])
+
                 break
 
         if not valid:
@@ -516,13 +1159,81 @@ class GA4Beamline():
 
         return tmpDict
 
+    def _VerifyOM(self, OM, fitness):
+        '''
+        # Purpose:
+            Ensure that Observer Mode is only used with epics fitness and has valid sampling parameters.
+
+        # Parameters:
+            # OM       : False, True, or a dict with 'period', 'capacity', 'window' and 'margin' (optional)
+            # fitness  : Fitness dict
+
+        # Returns:
+            # The sampling parameters passed to beamline.Observe(), or None when Observer Mode is off
+        '''
+        if OM is False or OM is None:
+            return None
+
+        if fitness["type"] != "epics":
+            raise MethodError(message = f"Observer Mode needs epics fitness, not {fitness['type']}.")
+
+        tmpDict = dict(oMode)
+
+        if isinstance(OM, dict):
+            for key in OM:
+                if key not in tmpDict:
+                    raise ValueError(f"{key} is not a valid Observer Mode parameter.")
+
+                tmpDict[key] = OM[key]
+
+        if tmpDict["period"] < 0:
+            raise ValueError(f"{tmpDict['period']} is not a valid 'period' value.")
+        if tmpDict["capacity"] < 2:
+            raise ValueError(f"{tmpDict['capacity']} is not a valid 'capacity' value.")
+        if tmpDict["window"] < 1:
+            raise ValueError(f"{tmpDict['window']} is not a valid 'window' value.")
+        if tmpDict["margin"] < 0:
+            raise ValueError(f"{tmpDict['margin']} is not a valid 'margin' value.")
+
+        return tmpDict
+
+    def _VerifyObjectives(self, fitness):
+        '''
+        # Purpose:
+            Ensure that multi-objective fitness is only used where it is supported.
+
+        # Parameters:
+            # fitness  : Fitness dict (objectives optional)
+
+        # Returns:
+            # Number of objectives stored for each individual (0 outside of nsga2)
+        '''
+        nObjectives = fitness.get("objectives", 1)
+
+        if nObjectives < 1:
+            raise ValueError(f"{nObjectives} is not a valid number of objectives.")
+
+        if self.sSel["name"] != "nsga2":
+            if nObjectives > 1:
+                raise MethodError(message = f"{nObjectives} objectives need the nsga2 survivor selection method.")
+
+            return 0
+
+        if nObjectives > 1 and fitness["type"] not in ("Func", "image"):
+            raise MethodError(message = f"Multiple objectives are not supported for {fitness['type']} fitness.")
+        if self.surrogate is not None:
+            raise MethodError(message = "A surrogate cannot be used with the nsga2 survivor selection method.")
+
+        return nObjectives
+
     def _VerifyParentMode(self, parentMode):
         '''
         # Purpose:
             Ensure that valid values have been passed in for determining the parent selection method.
 
         # Parameters:
-            # parentMode    : Parent selection method (name: Fitness) and parameters (alpha)
+            # parentMode    : Parent selection method (name: probRank, probFit, tournament or truncation) and parameters
+            #                   (s, k or fraction optional)
         '''
         valid = False
         tmpDict = {}
@@ -538,9 +1249,25 @@ class GA4Beamline():
                         tmpDict['s'] = parentMode['s']
                     else:
                         raise ValueError(f"{parentMode['s']} is not a valid 's' value")
-                else:
+                elif "s" in dictn:
                     tmpDict['s'] = dictn['s']
 
+                if "k" in dictn:
+                    k = parentMode.get("k", dictn["k"])
+
+                    if 1 <= k and k <= self.nPop and int(k) == k:
+                        tmpDict["k"] = int(k)
+                    else:
+                        raise ValueError(f"{k} is not a valid 'k' value.")
+
+                if "fraction" in dictn:
+                    fraction = parentMode.get("fraction", dictn["fraction"])
+
+                    if 0.0 < fraction and fraction <= 1.0:
+                        tmpDict["fraction"] = fraction
+                    else:
+                        raise ValueError(f"{fraction} is not a valid 'fraction' value.")
+
                 break
 
         if not valid:
@@ -585,7 +1312,8 @@ class GA4Beamline():
             Ensure that valid values have been passed in for determining the mutation method.
 
         # Parameters:
-            # cxMode        : Recombination method (name: simple,single or whole) and parameters (kwargs: alpha)
+            # mutationMode  : Mutation method (name: uniform, gaussian, cauchy or adaptive) and parameters (pGene and
+            #                   minStep optional)
         '''
         valid = False
         tmpDict = {}
@@ -595,6 +1323,22 @@ class GA4Beamline():
                 valid = True
                 tmpDict["name"] = mutationMode["name"]
 
+                if "pGene" in mutationMode:
+                    if 0.0 < mutationMode["pGene"] and mutationMode["pGene"] <= 1.0:
+                        tmpDict["pGene"] = mutationMode["pGene"]
+                    else:
+                        raise ValueError(f"{mutationMode['pGene']} is not a valid 'pGene' value.")
+                else:
+                    tmpDict["pGene"] = dictn["pGene"]
+
+                if "minStep" in dictn:
+                    minStep = mutationMode.get("minStep", dictn["minStep"])
+
+                    if 0.0 < minStep and minStep <= 1.0:
+                        tmpDict["minStep"] = minStep
+                    else:
+                        raise ValueError(f"{minStep} is not a valid 'minStep' value.")
+
                 break
 
         if not valid:
@@ -602,16 +1346,17 @@ class GA4Beamline():
 
         return tmpDict
 
-    def _MakeDataFrameCat(self):
-        categories = {}
+    def _MotorNames(self):
+        return [motor["name"] for motor in self.motors]
 
-        for motor in self.motors:
-            categories[motor["name"]] = []
-
-        categories["fitness"] = []
-        categories["ranking"] = []
-        categories["probability"] = []
+    def _MotorLimits(self):
+        """
+        Returns the lower and upper limits of the motors as numpy arrays.
+        """
+        lo = np.array([motor["lo"] for motor in self.motors], dtype = float)
+        hi = np.array([motor["hi"] for motor in self.motors], dtype = float)
 
-        #tmp = pd.DataFrame(categories)
+        return lo, hi
 
-        return categories
+    def _MotorSigmas(self):
+        return np.array([motor["sigma"] for motor in self.motors], dtype = float)
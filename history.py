@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+#Records the fitness history of a GA4Beamline run in growable NumPy columns, optionally streaming them to disk.
+
+import json
+import os
+import numpy as np
+
+#Columns of a history and the number of values stored per generation (None means one per motor)
+COLUMNS = {"aveFitness": 1, "peakFitness": 1, "peakParameters": None}
+VERSION = 1
+
+class FitHistory():
+    """
+    Average fitness, peak fitness, and peak motor configuration of each generation.
+
+    Values are kept in preallocated arrays that double in size when full.  When path is given, rows are appended to one
+        raw float64 file per column in that directory every chunkSize generations and dropped from memory, so long runs
+        use a fixed amount of memory.
+
+    ...
+
+    Parameters
+    ----------
+    names : list of str
+        Names of the motors, in the order of the peak parameters.
+    capacity : int, optional
+        Number of generations to preallocate (Default value is 64).
+    path : str, optional
+        Directory to stream the history to (Default value is None, which keeps everything in memory).
+    chunkSize : int, optional
+        Number of generations kept in memory before they are written to path (Default value is 1024).
+    append : bool, optional
+        Whether to add to a history already in path instead of replacing it (Default value is False).
+
+    Methods
+    -------
+    Append(aveFitness, peakFitness, peakParameters)
+        Records one generation.
+    Flush()
+        Writes the generations still in memory to path.
+    Stream(path)
+        Starts streaming a history kept in memory to path.
+    Truncate(rows)
+        Drops every generation after the first rows.
+    Columns()
+        Returns every recorded generation as a dict of arrays.
+    ToDataFrame()
+        Returns every recorded generation as a data frame in the layout of GA4Beamline.fitHistory.
+    Load(path)
+        Reads the columns of a history streamed to path.
+    """
+
+    def __init__(self, names, capacity = 64, path = None, chunkSize = 1024, append = False):
+        self.names = list(names)
+        self.path = path
+        self.chunkSize = chunkSize
+        self.flushed = 0
+        self.size = 0
+
+        self._columns = {}
+
+        for name in COLUMNS:
+            self._columns[name] = np.zeros((capacity, self._Width(name)))
+
+        if path is not None:
+            self._Open(append)
+
+    def _Width(self, name):
+        return COLUMNS[name] if COLUMNS[name] is not None else len(self.names)
+
+    def _Open(self, append):
+        os.makedirs(self.path, exist_ok = True)
+        metaPath = os.path.join(self.path, "meta.json")
+
+        if append and os.path.exists(metaPath):
+            with open(metaPath) as file:
+                meta = json.load(file)
+
+            if meta["names"] != self.names:
+                raise ValueError(f"History in {self.path} has motors {meta['names']}, not {self.names}.")
+
+            self.flushed = meta["rows"]
+        else:
+            for name in COLUMNS:
+                open(os.path.join(self.path, f"{name}.f8"), "wb").close()
+
+        self._WriteMeta()
+
+    def _WriteMeta(self):
+        meta = {"version": VERSION, "names": self.names, "rows": self.flushed,
+                "columns": {name: self._Width(name) for name in COLUMNS}}
+
+        with open(os.path.join(self.path, "meta.json"), "w") as file:
+            json.dump(meta, file)
+
+    def __len__(self):
+        return self.flushed + self.size
+
+    def Append(self, aveFitness, peakFitness, peakParameters):
+        """
+        Records the average fitness, peak fitness, and peak motor configuration of one generation.
+        """
+        if self.size == len(self._columns["aveFitness"]):
+            for name in COLUMNS:
+                grown = np.zeros((2 * max(self.size, 1), self._Width(name)))
+                grown[:self.size] = self._columns[name][:self.size]
+                self._columns[name] = grown
+
+        self._columns["aveFitness"][self.size, 0] = aveFitness
+        self._columns["peakFitness"][self.size, 0] = peakFitness
+        self._columns["peakParameters"][self.size] = peakParameters
+        self.size += 1
+
+        if self.path is not None and self.size >= self.chunkSize:
+            self.Flush()
+
+    def Flush(self):
+        """
+        Appends the generations in memory to the files in path.
+        """
+        if self.path is None or self.size == 0:
+            return
+
+        for name in COLUMNS:
+            with open(os.path.join(self.path, f"{name}.f8"), "ab") as file:
+                file.write(np.ascontiguousarray(self._columns[name][:self.size], dtype = "<f8").tobytes())
+
+        self.flushed += self.size
+        self.size = 0
+        self._WriteMeta()
+
+    def Stream(self, path):
+        """
+        Starts streaming a history kept in memory to the directory path, writing the generations recorded so far.
+        """
+        if self.path is not None:
+            raise ValueError(f"History is already streamed to {self.path}.")
+
+        self.path = path
+        self._Open(False)
+        self.Flush()
+
+    def Truncate(self, rows):
+        """
+        Drops every generation after the first rows, including ones already written to path.
+        """
+        if rows >= self.flushed:
+            self.size = min(self.size, rows - self.flushed)
+            return
+
+        for name in COLUMNS:
+            os.truncate(os.path.join(self.path, f"{name}.f8"), rows * self._Width(name) * 8)
+
+        self.flushed = rows
+        self.size = 0
+        self._WriteMeta()
+
+    @staticmethod
+    def Load(path, mmap = True):
+        """
+        Reads a history streamed to path.
+
+        Parameters
+        ----------
+        path : str
+            Directory the history was streamed to.
+        mmap : bool, optional
+            Whether to memory-map the files instead of reading them (Default value is True).
+
+        Returns
+        -------
+        dict
+            'names' and one array per column with a row per generation.
+        """
+        with open(os.path.join(path, "meta.json")) as file:
+            meta = json.load(file)
+
+        columns = {"names": meta["names"]}
+
+        for name, width in meta["columns"].items():
+            shape = (meta["rows"], width)
+            file = os.path.join(path, f"{name}.f8")
+
+            if mmap and meta["rows"] > 0:
+                columns[name] = np.memmap(file, dtype = "<f8", mode = "r", shape = shape)
+            else:
+                columns[name] = np.fromfile(file, dtype = "<f8", count = shape[0] * shape[1]).reshape(shape)
+
+        return columns
+
+    def Pending(self):
+        """
+        Returns the generations held in memory (not yet written to path) as a dict of 2-D arrays.
+        """
+        return {name: self._columns[name][:self.size].copy() for name in COLUMNS}
+
+    def Columns(self):
+        """
+        Returns every recorded generation as 'aveFitness', 'peakFitness' (1-D) and 'peakParameters' (generations x motors)
+            arrays, including the ones already written to path.
+        """
+        columns = {}
+        stored = self.Load(self.path, mmap = False) if self.path is not None and self.flushed > 0 else None
+
+        for name in COLUMNS:
+            values = self._columns[name][:self.size]
+
+            if stored is not None:
+                values = np.concatenate([stored[name], values])
+
+            columns[name] = values[:, 0] if COLUMNS[name] == 1 else values.copy()
+
+        return columns
+
+    def ToDataFrame(self):
+        import pandas as pd
+
+        columns = self.Columns()
+
+        return pd.DataFrame({"aveFitness": columns["aveFitness"], "peakFitness": columns["peakFitness"],
+                                "peakParameters": columns["peakParameters"].tolist()})
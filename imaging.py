@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+#Beam metrics computed from detector frames, used by the 'image' fitness type.
+#
+#Every frame is reduced to six raw moments (sums of I, I x, I y, I x^2, I y^2 and I x y over the pixels) a block of rows at
+#   a time.  Moments are linear in the frame, so averaging the moments of several frames gives the moments of their
+#   average frame without keeping any frame once it has been reduced.
+
+import numpy as np
+from beamline import MoveTo, RunSync
+
+METRICS = ["intensity", "centroidX", "centroidY", "fwhmX", "fwhmY", "ellipticity"]
+
+#FWHM of a Gaussian profile in standard deviations
+FWHM = 2 * np.sqrt(2 * np.log(2))
+
+def Moments(frame, background = 0.0, blockRows = 256):
+    """
+    Returns the raw moments of a frame: the sum of the pixel values weighted by 1, x, y, x^2, y^2 and x y, where x is the
+        column and y the row of each pixel.
+
+    Parameters
+    ----------
+    frame : numpy array
+        A 2-D detector frame of any numeric type, e.g. a slice of a memory-mapped stack.
+    background : float, optional
+        Level subtracted from every pixel (Default value is 0.0).
+    blockRows : int, optional
+        Number of rows converted to float at a time, bounding the temporary memory used (Default value is 256).
+
+    Returns
+    -------
+    numpy array
+        The six moments.
+    """
+    height, width = frame.shape
+    x = np.arange(width, dtype = float)
+    y = np.arange(height, dtype = float)
+    rows = np.zeros(height)
+    columns = np.zeros(width)
+    sxy = 0.0
+
+    for start in range(0, height, blockRows):
+        block = np.asarray(frame[start:start + blockRows], dtype = float)
+
+        rows[start:start + len(block)] = block.sum(axis = 1)
+        columns += block.sum(axis = 0)
+        sxy += y[start:start + len(block)] @ (block @ x)
+
+    moments = np.array([rows.sum(), columns @ x, rows @ y, columns @ x**2, rows @ y**2, sxy])
+
+    #Subtracting the background from every pixel only shifts each sum by the background times the sum of its weights
+    if background != 0.0:
+        moments -= background * np.array([height * width, height * x.sum(), width * y.sum(), height * (x**2).sum(),
+                                            width * (y**2).sum(), x.sum() * y.sum()])
+
+    return moments
+
+def Metrics(moments):
+    """
+    Converts raw moments into beam metrics.
+
+    Parameters
+    ----------
+    moments : numpy array
+        Raw moments from Moments(), or one row of them per frame or individual.
+
+    Returns
+    -------
+    dict of numpy array
+        'intensity' (sum of the pixel values), 'centroidX' and 'centroidY' (pixels), 'fwhmX' and 'fwhmY' (pixels, from
+            the second moments assuming a Gaussian profile), and 'ellipticity' (1 - minor / major axis, 0 for a round
+            beam).  Metrics other than intensity are NaN when the intensity is not positive.
+    """
+    moments = np.atleast_2d(moments)
+    total = moments[:, 0]
+    valid = total > 0
+    scale = np.where(valid, total, np.nan)
+
+    cx = moments[:, 1] / scale
+    cy = moments[:, 2] / scale
+    vx = np.maximum(moments[:, 3] / scale - cx**2, 0.0)
+    vy = np.maximum(moments[:, 4] / scale - cy**2, 0.0)
+    vxy = moments[:, 5] / scale - cx * cy
+
+    #Eigenvalues of the covariance matrix are the squared lengths of the beam's principal axes
+    mid = (vx + vy) / 2
+    radius = np.sqrt(((vx - vy) / 2)**2 + vxy**2)
+    major = mid + radius
+    minor = np.maximum(mid - radius, 0.0)
+    ellipticity = 1 - np.sqrt(np.divide(minor, major, out = np.ones(len(major)), where = major > 0))
+
+    return {"intensity": total, "centroidX": cx, "centroidY": cy, "fwhmX": FWHM * np.sqrt(vx),
+            "fwhmY": FWHM * np.sqrt(vy), "ellipticity": np.where(valid, ellipticity, np.nan)}
+
+def Score(metrics, metric):
+    """
+    Turns beam metrics into fitness values.
+
+    Parameters
+    ----------
+    metrics : dict of numpy array
+        Output of Metrics().
+    metric : str, list of str or callable
+        Name of the metric to maximize (prefixed with '-' to minimize it), a list of names for multi-objective fitness,
+            or a function taking metrics and returning the fitness of each individual.
+
+    Returns
+    -------
+    numpy array
+        The fitness of each individual, with one column per metric when metric is a list.  Individuals whose metric is
+            NaN (no intensity) get the lowest fitness of the batch.
+    """
+    if callable(metric):
+        return np.asarray(metric(metrics), dtype = float)
+
+    names = [metric] if isinstance(metric, str) else list(metric)
+    columns = []
+
+    for name in names:
+        sign = -1.0 if name.startswith("-") else 1.0
+        values = sign * metrics[name.lstrip("-")]
+
+        if np.isnan(values).any():
+            values = np.where(np.isnan(values), np.nanmin(values) if not np.isnan(values).all() else 0.0, values)
+
+        columns.append(values)
+
+    return columns[0] if isinstance(metric, str) else np.stack(columns, axis = 1)
+
+def Evaluate(source, individuals, nFrames = 1, metric = "intensity", background = 0.0):
+    """
+    Returns the fitness of each individual from the average moments of nFrames frames.  Only one frame is held at a
+        time.
+
+    Parameters
+    ----------
+    source : frame source
+        Object whose Frames(individual, n) yields n frames taken at an individual's configuration, e.g. ReplaySource or
+            DetectorSource.
+    individuals : numpy array
+        Motor positions with one row per individual (individuals x motors).
+    nFrames : int, optional
+        Number of frames averaged for each individual (Default value is 1).
+    metric : str, list of str or callable, optional
+        How to turn the metrics into fitness; see Score() (Default value is 'intensity').
+    background : float, optional
+        Level subtracted from every pixel (Default value is 0.0).
+    """
+    moments = np.zeros((len(individuals), 6))
+
+    for i in range(len(individuals)):
+        count = 0
+
+        for frame in source.Frames(individuals[i], nFrames):
+            moments[i] += Moments(frame, background)
+            count += 1
+
+        moments[i] /= max(count, 1)
+
+    return Score(Metrics(moments), metric)
+
+def OpenStack(path, shape = None, dtype = np.uint16, offset = 0):
+    """
+    Opens a stack of frames on disk without reading it.
+
+    Parameters
+    ----------
+    path : str
+        A .npy file, or a raw file of frames stored one after another.
+    shape : tuple of int, optional
+        (frames, height, width) of a raw file; the number of frames may be -1 to use the whole file (Default value is
+            None, required for raw files).
+    dtype : numpy dtype, optional
+        Pixel type of a raw file (Default value is numpy.uint16).
+    offset : int, optional
+        Bytes to skip at the start of a raw file (Default value is 0).
+
+    Returns
+    -------
+    numpy memmap
+        Read-only (frames x height x width) view of the file.
+    """
+    if str(path).endswith(".npy"):
+        return np.load(path, mmap_mode = "r")
+
+    if shape is None:
+        raise ValueError("The shape of a raw frame stack must be given.")
+
+    frames = np.memmap(path, dtype = dtype, mode = "r", offset = offset)
+
+    return frames.reshape(shape)
+
+class ReplaySource():
+    """
+    Serves frames recorded earlier, in order, for offline replay of a run.  Individuals are ignored.
+
+    ...
+
+    Parameters
+    ----------
+    stack : numpy array
+        Frames (frames x height x width), e.g. from OpenStack().
+    loop : bool, optional
+        Whether to start again from the first frame once every frame was served (Default value is False).
+
+    Attributes
+    ----------
+    position : int
+        Index of the next frame served.
+    """
+
+    def __init__(self, stack, loop = False):
+        self.stack = stack
+        self.loop = loop
+        self.position = 0
+
+    def Frames(self, individual, n):
+        for i in range(n):
+            if self.position >= len(self.stack):
+                if not self.loop:
+                    raise IndexError(f"The frame stack ran out after {len(self.stack)} frames.")
+
+                self.position = 0
+
+            self.position += 1
+
+            yield self.stack[self.position - 1]
+
+class DetectorSource():
+    """
+    Moves the beamline to each individual's configuration and reads frames from an area detector.
+
+    ...
+
+    Parameters
+    ----------
+    control : BeamlineControl
+        The beamline to measure, e.g. beamline.EpicsControl.  Its Read() must return the detector image as an array.
+    names : list of str
+        Name (PV name for epics motors) of each motor.
+    pv : str
+        PV holding the detector image.
+    shape : tuple of int
+        (height, width) of the image, used to reshape flat arrays.
+    timeout : float, optional
+        Seconds to wait for each move (Default value is None, which waits indefinitely).
+    """
+
+    def __init__(self, control, names, pv, shape, timeout = None):
+        self.control = control
+        self.names = names
+        self.pv = pv
+        self.shape = tuple(shape)
+        self.timeout = timeout
+
+    def Frames(self, individual, n):
+        RunSync(MoveTo(self.control, self.names, individual, self.timeout))
+
+        for i in range(n):
+            yield np.asarray(RunSync(self.control.Read(self.pv))).reshape(self.shape)
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+
+#Island model: several GA4Beamline populations evolving in their own processes and exchanging their best individuals.
+
+import multiprocessing
+import numpy as np
+from ga4beamlines import GA4Beamline, MethodError
+
+class _Island():
+    """
+    Holds one GA4Beamline and carries out the commands sent by IslandModel.
+    """
+
+    def __init__(self, motors, config, fitness, seed):
+        self.ga = GA4Beamline(motors, config["survivorMode"], config["parentMode"], config["cxMode"],
+                                config["mutationMode"], fitness, nPop = config.get("nPop", 10), seed = seed)
+        self.ga.FirstGeneration()
+
+    def Evolve(self, generations, nMigrants, target):
+        """
+        Runs up to generations generations, stopping early once target is reached, and returns the number of generations
+            run, the peak fitness, and the best nMigrants individuals (genes, fitness, and step sizes, None unless the
+            mutation method is adaptive).
+        """
+        done = 0
+
+        while done < generations and (target is None or self._Peak() < target):
+            self.ga.NextGeneration()
+            done += 1
+
+        pop = self.ga.pop
+        best = np.argsort(-pop.fitness[:pop.size], kind = "stable")[:nMigrants]
+
+        sigmas = pop.sigmas[:, best].copy() if pop.sigmas is not None else None
+
+        return done, self._Peak(), pop.genes[:, best].copy(), pop.fitness[best].copy(), sigmas
+
+    def Immigrate(self, genes, fitness, sigmas = None):
+        """
+        Replaces the worst individuals of the population with the immigrants, keeping at least one native.  Immigrants
+            bring their own step sizes for the adaptive mutation method, or start from the motor sigmas when they come
+            from islands using another method.
+        """
+        pop = self.ga.pop
+        n = min(len(fitness), pop.size - 1)
+
+        if n <= 0:
+            return
+
+        worst = np.argpartition(pop.fitness[:pop.size], n - 1)[:n]
+        pop.genes[:, worst] = genes[:, :n]
+        pop.fitness[worst] = fitness[:n]
+
+        if pop.sigmas is not None:
+            pop.sigmas[:, worst] = sigmas[:, :n] if sigmas is not None else self.ga._MotorSigmas()[:, np.newaxis]
+
+        pop.ranked = False
+
+    def History(self):
+        return self.ga.fitHistory
+
+    def _Peak(self):
+        return float(self.ga.pop.fitness[:self.ga.pop.size].max())
+
+def _IslandWorker(conn, motors, config, fitness, seed):
+    """
+    Runs an _Island in a worker process, answering each (method name, arguments) message with the method's result.
+    """
+    island = _Island(motors, config, fitness, seed)
+
+    while True:
+        command = conn.recv()
+
+        if command is None:
+            break
+
+        conn.send(getattr(island, command[0])(*command[1]))
+
+    conn.close()
+
+class _RemoteIsland():
+    """
+    Sends commands to an _Island running in another process.  Submit() and Result() are split so every island can work
+        at the same time.
+    """
+
+    def __init__(self, context, motors, config, fitness, seed):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target = _IslandWorker, args = (child, motors, config, fitness, seed), daemon = True)
+        self.process.start()
+        child.close()
+
+    def Submit(self, method, *args):
+        self.conn.send((method, args))
+
+    def Result(self):
+        return self.conn.recv()
+
+    def Close(self):
+        self.conn.send(None)
+        self.process.join()
+
+class _LocalIsland():
+    """
+    Runs an _Island in the current process with the same interface as _RemoteIsland.
+    """
+
+    def __init__(self, context, motors, config, fitness, seed):
+        self.island = _Island(motors, config, fitness, seed)
+        self._result = None
+
+    def Submit(self, method, *args):
+        self._result = getattr(self.island, method)(*args)
+
+    def Result(self):
+        return self._result
+
+    def Close(self):
+        pass
+
+class IslandModel():
+    """
+    Evolves several populations at once, one per process, and periodically sends the best individuals of each island to
+        its neighbours.
+
+    ...
+
+    Parameters
+    ----------
+    motors : list of dict
+        Motors passed to every GA4Beamline.
+    configs : list of dict
+        One configuration per island with 'survivorMode', 'parentMode', 'cxMode', 'mutationMode' and optionally 'nPop'
+            keys, e.g. from sweep.Grid().
+    fitness : dict
+        Fitness passed to every GA4Beamline.  Its function must be picklable when processes is True.
+    topology : str or list of list of int, optional
+        Where each island sends its migrants: "ring" (to the next island), "full" (to every other island), or, for each
+            island, the list of islands it sends to (Default value is "ring").
+    interval : int, optional
+        Number of generations between migrations (Default value is 10).
+    nMigrants : int, optional
+        Number of individuals each island sends to each neighbour (Default value is 1).
+    seed : int, optional
+        Root seed; each island gets its own stream spawned from it (Default value is None).
+    processes : bool, optional
+        Whether to run each island in its own process (Default value is True).  False runs them one after another in the
+            current process.
+
+    Attributes
+    ----------
+    generation : int
+        Number of generations run by the islands so far.
+    peakFitness : list of float
+        Peak fitness of each island after the last epoch.
+
+    Methods
+    -------
+    Run(generations, target)
+        Evolves the islands until generations have run or any island reaches target.
+    Histories()
+        Returns the fitHistory of each island.
+    Close()
+        Stops the worker processes.
+    """
+
+    def __init__(self, motors, configs, fitness, topology = "ring", interval = 10, nMigrants = 1, seed = None,
+                    processes = True):
+        #Migrants carry a single fitness value, which nsga2 scores are not comparable as between islands
+        if any(config["survivorMode"]["name"] == "nsga2" for config in configs):
+            raise MethodError(message = "The nsga2 survivor selection method is not supported on islands.")
+
+        self.interval = interval
+        self.nMigrants = nMigrants
+        self.targets = self._Topology(topology, len(configs))
+        self.generation = 0
+        self.peakFitness = [None] * len(configs)
+        self.best = None
+
+        seeds = np.random.SeedSequence(seed).spawn(len(configs))
+        context = multiprocessing.get_context()
+        kind = _RemoteIsland if processes else _LocalIsland
+
+        self._islands = [kind(context, motors, configs[i], fitness, seeds[i]) for i in range(len(configs))]
+
+    def _Topology(self, topology, n):
+        if topology == "ring":
+            return [[(i + 1) % n] if n > 1 else [] for i in range(n)]
+        elif topology == "full":
+            return [[j for j in range(n) if j != i] for i in range(n)]
+
+        if len(topology) != n:
+            raise ValueError(f"Topology has {len(topology)} entries for {n} islands.")
+
+        return [list(targets) for targets in topology]
+
+    def Run(self, generations, target = None):
+        """
+        Evolves the islands in epochs of interval generations with a migration after each epoch.
+
+        Parameters
+        ----------
+        generations : int
+            Maximum number of generations to run.
+        target : float, optional
+            Stop once any island's peak fitness reaches this value (Default value is None).
+
+        Returns
+        -------
+        dict
+            Generations run ('generations'), whether target was reached ('reached'), the best fitness ('peakFitness')
+                and the best motor configuration ('peakParameters') found on any island, None before any generation ran.
+        """
+        reached = False
+        done = 0
+
+        while done < generations and not reached:
+            epoch = min(self.interval, generations - done)
+
+            for island in self._islands:
+                island.Submit("Evolve", epoch, self.nMigrants, target)
+
+            results = [island.Result() for island in self._islands]
+
+            done += max(result[0] for result in results)
+            self.peakFitness = [result[1] for result in results]
+            self._KeepBest(results)
+            reached = target is not None and max(self.peakFitness) >= target
+
+            if not reached and done < generations:
+                self._Migrate(results)
+
+        self.generation += done
+
+        #No epoch has run yet when generations is 0 on a new model
+        if self.best is None:
+            return {"generations": done, "reached": reached, "peakFitness": None, "peakParameters": None}
+
+        return {"generations": done, "reached": reached, "peakFitness": self.best[1],
+                "peakParameters": self.best[0].tolist()}
+
+    def _KeepBest(self, results):
+        for result in results:
+            if len(result[3]) > 0 and (self.best is None or result[3][0] > self.best[1]):
+                self.best = (result[2][:, 0].copy(), float(result[3][0]))
+
+    def _Migrate(self, results):
+        incoming = [[] for island in self._islands]
+
+        for i in range(len(results)):
+            for j in self.targets[i]:
+                incoming[j].append(i)
+
+        for j in range(len(self._islands)):
+            if len(incoming[j]) > 0:
+                genes = np.concatenate([results[i][2] for i in incoming[j]], axis = 1)
+                fitness = np.concatenate([results[i][3] for i in incoming[j]])
+                sigmas = None
+
+                if all(results[i][4] is not None for i in incoming[j]):
+                    sigmas = np.concatenate([results[i][4] for i in incoming[j]], axis = 1)
+
+                self._islands[j].Submit("Immigrate", genes, fitness, sigmas)
+
+        for j in range(len(self._islands)):
+            if len(incoming[j]) > 0:
+                self._islands[j].Result()
+
+    def Histories(self):
+        for island in self._islands:
+            island.Submit("History")
+
+        return [island.Result() for island in self._islands]
+
+    def Close(self):
+        for island in self._islands:
+            island.Close()
+
+        self._islands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+#Non-dominated sorting and crowding distance for multi-objective (NSGA-II) selection.  Every objective is maximized.
+
+import numpy as np
+
+def Dominance(objectives):
+    """
+    Returns a boolean matrix whose entry [i, j] is True when individual i dominates individual j: it is at least as good
+        on every objective and better on at least one.
+
+    Parameters
+    ----------
+    objectives : numpy array
+        Objective values with one row per individual (individuals x objectives).
+    """
+    objectives = np.asarray(objectives, dtype = float)
+    n = len(objectives)
+    notWorse = np.ones((n, n), dtype = bool)
+    better = np.zeros((n, n), dtype = bool)
+
+    #One objective at a time keeps memory at a few n x n boolean matrices
+    for m in range(objectives.shape[1]):
+        column = objectives[:, m]
+        notWorse &= column[:, np.newaxis] >= column
+        better |= column[:, np.newaxis] > column
+
+    return notWorse & better
+
+def NonDominatedSort(objectives):
+    """
+    Returns the front of each individual: 0 for those no other individual dominates, 1 for those only dominated by front
+        0, and so on.
+    """
+    dominance = Dominance(objectives)
+    fronts = np.full(len(dominance), -1)
+    dominatedBy = dominance.sum(axis = 0)
+    current = np.flatnonzero(dominatedBy == 0)
+    front = 0
+
+    while len(current) > 0:
+        fronts[current] = front
+
+        #Removing a front lowers the count of everything it dominated; those reaching 0 form the next front
+        dominatedBy = dominatedBy - dominance[current].sum(axis = 0)
+        dominatedBy[current] = -1
+        current = np.flatnonzero(dominatedBy == 0)
+        front += 1
+
+    return fronts
+
+def CrowdingDistance(objectives, fronts):
+    """
+    Returns the crowding distance of each individual within its front: the sum over objectives of the gap between its
+        two neighbours, relative to the front's range.  The individuals at either end of a front get infinity.
+    """
+    objectives = np.asarray(objectives, dtype = float)
+    fronts = np.asarray(fronts)
+    distance = np.zeros(len(objectives))
+
+    for m in range(objectives.shape[1]):
+        #Sorting by front then value puts every front in a contiguous, ordered block
+        order = np.lexsort((objectives[:, m], fronts))
+        values = objectives[order, m]
+        boundary = fronts[order][1:] != fronts[order][:-1]
+        first = np.concatenate([[True], boundary])
+        last = np.concatenate([boundary, [True]])
+
+        block = np.cumsum(first) - 1
+        span = (values[last] - values[first])[block]
+        gap = np.zeros(len(values))
+        gap[1:-1] = values[2:] - values[:-2]
+
+        gap = np.divide(gap, span, out = np.zeros(len(values)), where = span > 0)
+        gap[first | last] = np.inf
+        distance[order] += gap
+
+    return distance
+
+def CrowdedScore(objectives):
+    """
+    Returns a scalar score ordering individuals as NSGA-II's crowded comparison does: a lower front is always better, and
+        within a front a larger crowding distance is better.  The score of front f lies in [-f, -f + 0.5].
+    """
+    fronts = NonDominatedSort(objectives)
+    distance = CrowdingDistance(objectives, fronts)
+    spread = np.divide(distance, 1.0 + distance, out = np.ones(len(distance)), where = np.isfinite(distance))
+
+    return -fronts + 0.5 * spread
+
+class ParetoArchive():
+    """
+    Keeps every non-dominated configuration found so far.
+
+    ...
+
+    Parameters
+    ----------
+    maxSize : int, optional
+        Maximum number of configurations kept; the most crowded are dropped first (Default value is None, which keeps
+            all of them).
+
+    Attributes
+    ----------
+    individuals : numpy array
+        Motor positions of the configurations (configurations x motors).
+    objectives : numpy array
+        Objective values of the configurations (configurations x objectives).
+
+    Methods
+    -------
+    Update(individuals, objectives)
+        Adds configurations, keeping only the non-dominated ones.
+    ToDataFrame(names)
+        Returns the archive with a column for each motor name followed by one for each objective.
+    """
+
+    def __init__(self, maxSize = None):
+        self.maxSize = maxSize
+        self.individuals = None
+        self.objectives = None
+
+    def __len__(self):
+        return 0 if self.individuals is None else len(self.individuals)
+
+    def Update(self, individuals, objectives):
+        individuals = np.asarray(individuals, dtype = float)
+        objectives = np.asarray(objectives, dtype = float).reshape(len(individuals), -1)
+
+        if self.individuals is not None:
+            individuals = np.concatenate([self.individuals, individuals])
+            objectives = np.concatenate([self.objectives, objectives])
+
+        #Only the first front is kept, once per configuration
+        keep = ~Dominance(objectives).any(axis = 0)
+        keep[np.setdiff1d(np.arange(len(individuals)), np.unique(individuals, axis = 0, return_index = True)[1])] = False
+        individuals = individuals[keep]
+        objectives = objectives[keep]
+
+        if self.maxSize is not None and len(individuals) > self.maxSize:
+            distance = CrowdingDistance(objectives, np.zeros(len(objectives), dtype = int))
+            keep = np.sort(np.argsort(-distance, kind = "stable")[:self.maxSize])
+            individuals = individuals[keep]
+            objectives = objectives[keep]
+
+        self.individuals = individuals
+        self.objectives = objectives
+
+    def ToDataFrame(self, names):
+        import pandas as pd
+
+        categories = {}
+
+        for i in range(len(names)):
+            categories[names[i]] = self.individuals[:, i].copy() if self.individuals is not None else []
+        for i in range(0 if self.objectives is None else self.objectives.shape[1]):
+            categories[f"objective{i}"] = self.objectives[:, i].copy()
+
+        return pd.DataFrame(categories)
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+
+#Stores the results of many runs in one place: the settings of each run as indexed columns of a SQLite table, and the
+#   fitness history of every run appended to raw little-endian float64 files (like history.FitHistory).
+#
+#   store = ResultsStore("results")
+#   ImportLegacy(store, "csv", "pickle")
+#   store.Aggregate("peakFitness", survivor = "genitor", mutation = "gaussian")
+
+import glob
+import os
+import re
+import sqlite3
+import warnings
+import numpy as np
+
+#Settings of a run, in the order of the table's columns
+SETTINGS = {"survivor": "TEXT", "nElite": "INTEGER", "parent": "TEXT", "s": "REAL", "k": "INTEGER", "fraction": "REAL",
+            "cx": "TEXT", "alpha": "REAL", "mutation": "TEXT", "pGene": "REAL", "nPop": "INTEGER",
+            "generations": "INTEGER", "config": "INTEGER", "initPop": "INTEGER", "run": "INTEGER", "source": "TEXT"}
+#Where each run's history is and a summary of it
+RECORDS = {"motors": "INTEGER", "offset": "INTEGER", "parameters": "INTEGER", "length": "INTEGER",
+            "firstGeneration": "INTEGER", "lastGeneration": "INTEGER", "aveFitness": "REAL", "peakFitness": "REAL"}
+#Values kept per generation, and how many per motor
+COLUMNS = {"aveFitness": 0, "peakFitness": 0, "peakParameters": 1}
+INDEXED = ["survivor", "parent", "cx", "mutation", "nPop", "source"]
+
+#Names of the files written by the original scripts, e.g. genitor0_probRank1.5_simple0.75_gaussian_PopS10_Gens500_InitPop2_RunsEach11
+LEGACY = re.compile(r"(?P<survivor>[A-Za-z]+)(?P<nElite>\d+)_(?P<parent>[A-Za-z]+)(?P<s>[\d.]+)_(?P<cx>[A-Za-z]+)"
+                    r"(?P<alpha>[\d.]+)_(?P<mutation>[A-Za-z]+)_PopS(?P<nPop>\d+)_Gens(?P<generations>\d+)_"
+                    r"(?:InitPop|DiffPops)(?P<initPops>\d+)_RunsEach(?P<runsEach>\d+)$")
+
+class ResultsStore():
+    """
+    Indexed store of run settings and fitness histories.
+
+    ...
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the store; created if missing.
+
+    Methods
+    -------
+    Add(settings, aveFitness, peakFitness, peakParameters, firstGeneration)
+        Adds one run and returns its id.
+    AddRun(ga, **settings)
+        Adds the history of a GA4Beamline.
+    AddFrame(frame)
+        Adds every run of a data frame returned by sweep.RunSweep().
+    Query(where, **filters)
+        Returns the settings and summary of the matching runs as a data frame.
+    Histories(ids, column)
+        Returns the history of the given runs as a (runs x generations) array.
+    Aggregate(column, how, where, **filters)
+        Reduces the history of the matching runs to one value per generation.
+    Close()
+        Closes the database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok = True)
+
+        self._db = sqlite3.connect(os.path.join(path, "runs.sqlite"))
+        columns = ", ".join(f"{name} {kind}" for name, kind in {**SETTINGS, **RECORDS}.items())
+
+        with self._db:
+            self._db.execute(f"CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, {columns})")
+
+            for name in INDEXED:
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS runs_{name} ON runs ({name})")
+
+    def _File(self, name):
+        return os.path.join(self.path, f"{name}.f8")
+
+    def _Size(self, name):
+        return os.path.getsize(self._File(name)) // 8 if os.path.exists(self._File(name)) else 0
+
+    def Add(self, settings, aveFitness, peakFitness, peakParameters, firstGeneration = 0):
+        """
+        Adds one run.
+
+        Parameters
+        ----------
+        settings : dict
+            Values of the run for any of the keys of SETTINGS; others are ignored.
+        aveFitness : numpy array
+            Average fitness of each recorded generation.
+        peakFitness : numpy array
+            Peak fitness of each recorded generation.
+        peakParameters : numpy array
+            Peak motor configuration of each recorded generation (generations x motors).
+        firstGeneration : int, optional
+            Generation of the first record (Default value is 0).
+
+        Returns
+        -------
+        int
+            Id of the run.
+        """
+        values = {"aveFitness": np.asarray(aveFitness, dtype = float).reshape(-1),
+                    "peakFitness": np.asarray(peakFitness, dtype = float).reshape(-1)}
+        length = len(values["aveFitness"])
+        values["peakParameters"] = np.asarray(peakParameters, dtype = float).reshape(length, -1)
+        motors = values["peakParameters"].shape[1]
+        offset = self._Size("aveFitness")
+        parameters = self._Size("peakParameters")
+
+        #The history is written before the row pointing to it, so an interrupted Add never leaves a dangling row
+        for name in COLUMNS:
+            with open(self._File(name), "ab") as file:
+                file.write(np.ascontiguousarray(values[name], dtype = "<f8").tobytes())
+
+        row = {key: _Plain(settings[key]) for key in SETTINGS if key in settings}
+        row.update({"motors": motors, "offset": offset, "parameters": parameters, "length": length,
+                    "firstGeneration": int(firstGeneration), "lastGeneration": int(firstGeneration) + length - 1,
+                    "aveFitness": float(values["aveFitness"][-1]), "peakFitness": float(values["peakFitness"][-1])})
+
+        with self._db:
+            cursor = self._db.execute(f"INSERT INTO runs ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                                        list(row.values()))
+
+        return cursor.lastrowid
+
+    def AddRun(self, ga, **settings):
+        """
+        Adds the history of a GA4Beamline with its settings.  Extra settings (e.g. initPop, run) are given as keywords.
+        """
+        columns = ga.history.Columns()
+
+        return self.Add({**Labels(ga), **settings}, columns["aveFitness"], columns["peakFitness"],
+                        columns["peakParameters"])
+
+    def AddFrame(self, frame):
+        """
+        Adds every run of a data frame with one row per generation and the settings as columns, e.g. from
+            sweep.RunSweep().  Runs are told apart by their 'config', 'initPop', and 'run' columns.
+
+        Returns
+        -------
+        list of int
+            Ids of the runs added.
+        """
+        keys = [key for key in ("config", "initPop", "run") if key in frame]
+        groups = frame.groupby(keys, sort = False) if len(keys) > 0 else [(None, frame)]
+        ids = []
+
+        for key, group in groups:
+            first = group.iloc[0]
+            settings = {name: first[name] for name in SETTINGS if name in group}
+            settings.setdefault("generations", len(group.index) - 1)
+            start = int(group["generation"].iloc[0]) if "generation" in group else 0
+
+            ids.append(self.Add(settings, group["aveFitness"].to_numpy(dtype = float),
+                                group["peakFitness"].to_numpy(dtype = float),
+                                np.array(group["peakParameters"].tolist(), dtype = float), start))
+
+        return ids
+
+    def _Where(self, where, filters):
+        """
+        Builds a WHERE clause matching every filter (a value or a list of values per column) and the SQL in where.
+        """
+        clauses = []
+        parameters = []
+
+        for name, value in filters.items():
+            if name not in SETTINGS and name not in RECORDS and name != "id":
+                raise ValueError(f"{name} is not a column of the results store.")
+
+            if isinstance(value, (list, tuple, set, np.ndarray)):
+                clauses.append(f"{name} IN ({', '.join('?' * len(value))})")
+                parameters.extend(_Plain(v) for v in value)
+            else:
+                clauses.append(f"{name} = ?")
+                parameters.append(_Plain(value))
+
+        if where is not None:
+            clauses.append(f"({where})")
+
+        return (" WHERE " + " AND ".join(clauses) if len(clauses) > 0 else ""), parameters
+
+    def Query(self, where = None, **filters):
+        """
+        Returns the settings and summary of every run matching the filters as a data frame indexed by id.
+
+        Parameters
+        ----------
+        where : str, optional
+            Extra SQL condition, e.g. "peakFitness > 0.9" (Default value is None).
+        **filters
+            Column values to match, e.g. survivor = "genitor", or lists of values to match any of, e.g. nPop = [10, 100].
+        """
+        import pandas as pd
+
+        clause, parameters = self._Where(where, filters)
+
+        return pd.read_sql_query(f"SELECT * FROM runs{clause} ORDER BY id", self._db, params = parameters,
+                                    index_col = "id")
+
+    def Histories(self, ids, column = "peakFitness"):
+        """
+        Returns one column of the history of the given runs.
+
+        Parameters
+        ----------
+        ids : list of int
+            Runs to read.
+        column : str, optional
+            'aveFitness', 'peakFitness', or 'peakParameters' (Default value is 'peakFitness').
+
+        Returns
+        -------
+        numpy array
+            One row per run and one column per generation from the earliest first generation to the latest last one,
+                with NaN where a run has no record (runs x generations, and x motors for 'peakParameters').
+        numpy array
+            The generation of each column.
+        """
+        ids = [int(i) for i in ids]
+
+        if len(ids) == 0:
+            return np.zeros((0, 0)), np.zeros(0, dtype = int)
+
+        rows = self._db.execute(f"SELECT id, offset, length, firstGeneration, motors, parameters FROM runs WHERE id IN "
+                                f"({', '.join('?' * len(ids))})", ids).fetchall()
+        rows = {row[0]: row[1:] for row in rows}
+
+        first = min(rows[i][2] for i in ids)
+        last = max(rows[i][2] + rows[i][1] - 1 for i in ids)
+        motors = max(rows[i][3] for i in ids)
+        shape = (len(ids), last - first + 1) + ((motors,) if COLUMNS[column] else ())
+        histories = np.full(shape, np.nan)
+        data = np.memmap(self._File(column), dtype = "<f8", mode = "r")
+
+        for j, i in enumerate(ids):
+            offset, length, start, width, parameters = rows[i]
+
+            if COLUMNS[column]:
+                block = data[parameters:parameters + length * width].reshape(length, width)
+                histories[j, start - first:start - first + length, :width] = block
+            else:
+                histories[j, start - first:start - first + length] = data[offset:offset + length]
+
+        return histories, np.arange(first, last + 1)
+
+    def Aggregate(self, column = "peakFitness", how = "mean", where = None, **filters):
+        """
+        Reduces the history of every run matching the filters (see Query()) to one value per generation.
+
+        Parameters
+        ----------
+        column : str, optional
+            'aveFitness' or 'peakFitness' (Default value is 'peakFitness').
+        how : str, optional
+            'mean', 'median', 'std', 'min', 'max', or 'count' (Default value is 'mean').  Runs without a record for a
+                generation are left out of it.
+
+        Returns
+        -------
+        pandas series
+            The reduced value indexed by generation.
+        """
+        import pandas as pd
+
+        clause, parameters = self._Where(where, filters)
+        ids = [row[0] for row in self._db.execute(f"SELECT id FROM runs{clause}", parameters)]
+        histories, generations = self.Histories(ids, column)
+
+        if how == "count":
+            values = np.sum(~np.isnan(histories), axis = 0)
+        elif len(ids) == 0:
+            values = np.zeros(0)
+        else:
+            #Generations no run recorded give NaN
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)
+                values = getattr(np, f"nan{how}")(histories, axis = 0)
+
+        return pd.Series(values, index = pd.Index(generations, name = "generation"), name = f"{how} {column}")
+
+    def Sources(self):
+        """
+        Returns the set of source files already imported.
+        """
+        return {row[0] for row in self._db.execute("SELECT DISTINCT source FROM runs WHERE source IS NOT NULL")}
+
+    def Close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.Close()
+
+def Labels(ga):
+    """
+    Returns the settings of a GA4Beamline as flat columns, named as in SETTINGS.
+    """
+    return {"survivor": ga.sSel["name"], "nElite": ga.sSel["nElite"],
+            "parent": ga.pSel["name"], "s": ga.pSel.get("s", np.nan),
+            "k": ga.pSel.get("k", np.nan), "fraction": ga.pSel.get("fraction", np.nan),
+            "cx": ga.cxMode["name"], "alpha": ga.cxMode["alpha"],
+            "mutation": ga.mMode["name"], "pGene": ga.mMode["pGene"],
+            "nPop": ga.nPop}
+
+def _Plain(value):
+    """
+    Converts NumPy scalars to Python values SQLite accepts; NaN is stored as NULL.
+    """
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+
+    return value
+
+def ParseName(name):
+    """
+    Returns the settings encoded in the name of a file written by the original scripts, or None if it does not match.
+    """
+    #Settings such as alpha0.75 hold dots, so only a known extension is removed
+    match = LEGACY.match(re.sub(r"\.(csv|pkl)$", "", os.path.basename(name)))
+
+    if match is None:
+        return None
+
+    settings = match.groupdict()
+
+    for key in ("nElite", "nPop", "generations", "initPops", "runsEach"):
+        settings[key] = int(settings[key])
+    for key in ("s", "alpha"):
+        settings[key] = float(settings[key])
+
+    return settings
+
+def ImportLegacy(store, csvDir = "csv", pickleDir = "pickle"):
+    """
+    Imports the results written by the original scripts: one file per configuration whose rows are the final average
+        fitness, peak fitness, peak parameters, and generation of each run.  Each run is stored with a single record at
+        its final generation.  A configuration saved as both pickle and CSV is only imported once (from the pickle), and
+        files already in the store are skipped.
+
+    Returns
+    -------
+    list of str
+        Files that were imported.
+    """
+    import pandas as pd
+
+    files = {}
+
+    #Pickles keep the exact values, so they win over CSV files with the same name
+    for pattern, reader in ((os.path.join(csvDir, "*.csv"), lambda path: pd.read_csv(path, index_col = 0)),
+                            (os.path.join(pickleDir, "*.pkl"), pd.read_pickle)):
+        for path in sorted(glob.glob(pattern)):
+            files[os.path.basename(path)[:-4]] = (path, reader)
+
+    imported = []
+    done = store.Sources()
+
+    for name, (path, reader) in sorted(files.items()):
+        settings = ParseName(name)
+
+        if settings is None or path in done:
+            continue
+
+        frame = reader(path)
+        runsEach = settings.pop("runsEach")
+        settings.pop("initPops")
+        settings["source"] = path
+
+        for i in range(len(frame.index)):
+            row = frame.iloc[i]
+            parameters = row["peakParameters"]
+
+            if isinstance(parameters, str):
+                parameters = [float(value) for value in parameters.strip("[]").split(",")]
+
+            store.Add({**settings, "initPop": i // runsEach, "run": i % runsEach}, [float(row["aveFitness"])],
+                        [float(row["peakFitness"])], [parameters], int(row["generation"]))
+
+        imported.append(path)
+
+    return imported
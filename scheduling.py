@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+#Orders the individuals of a generation so the motors travel as little as possible between evaluations.
+
+import numpy as np
+
+def TravelTimes(points, velocity):
+    """
+    Returns the time needed to move between every pair of configurations.  Motors move at the same time, so a move takes
+        as long as its slowest axis.
+
+    Parameters
+    ----------
+    points : numpy array
+        Motor positions with one row per configuration (configurations x motors).
+    velocity : numpy array
+        Speed of each motor.
+
+    Returns
+    -------
+    numpy array
+        Travel time from configuration i to configuration j (configurations x configurations).
+    """
+    times = np.zeros((len(points), len(points)))
+
+    #Looping over motors keeps the memory at one configurations x configurations matrix
+    for m in range(points.shape[1]):
+        np.maximum(times, np.abs(points[:, m, np.newaxis] - points[np.newaxis, :, m]) / velocity[m], out = times)
+
+    return times
+
+def PathTime(times, path):
+    """
+    Returns the total travel time of visiting the nodes of times in the order of path.
+    """
+    path = np.asarray(path)
+
+    return float(times[path[:-1], path[1:]].sum())
+
+def NearestNeighbour(times, start):
+    """
+    Builds a path from start that always moves to the closest configuration not yet visited.
+    """
+    n = len(times)
+    visited = np.zeros(n, dtype = bool)
+    path = [start]
+    visited[start] = True
+
+    for i in range(n - 1):
+        dist = np.where(visited, np.inf, times[path[-1]])
+        path.append(int(np.argmin(dist)))
+        visited[path[-1]] = True
+
+    return path
+
+def TwoOpt(times, path, maxPasses = 10):
+    """
+    Improves an open path by reversing segments while doing so shortens it.  The first and last nodes stay fixed.
+
+    Parameters
+    ----------
+    times : numpy array
+        Symmetric travel time matrix.
+    path : list of int
+        Path to improve.
+    maxPasses : int, optional
+        Maximum number of sweeps over the path (Default value is 10).
+    """
+    path = np.asarray(path)
+
+    for p in range(maxPasses):
+        improved = False
+
+        for i in range(1, len(path) - 2):
+            #Gain of reversing path[i:j + 1] for every j at once
+            j = np.arange(i + 1, len(path) - 1)
+            delta = (times[path[i - 1], path[j]] + times[path[i], path[j + 1]]
+                        - times[path[i - 1], path[i]] - times[path[j], path[j + 1]])
+            best = int(np.argmin(delta))
+
+            if delta[best] < -1e-12:
+                path[i:j[best] + 1] = path[i:j[best] + 1][::-1].copy()
+                improved = True
+
+        if not improved:
+            break
+
+    return path.tolist()
+
+class TravelScheduler():
+    """
+    Reorders each batch of individuals before evaluation to minimize the time spent moving motors.  Orders are built with
+        a nearest neighbour path followed by 2-opt improvement, starting from where the motors were left by the previous
+        batch.
+
+    ...
+
+    Parameters
+    ----------
+    velocity : list of float
+        Speed of each motor.
+    position : list of float, optional
+        Current motor positions (Default value is None, which starts each path at the first individual of the first batch).
+    twoOpt : bool, optional
+        Whether to improve the nearest neighbour path with 2-opt (Default value is True).
+
+    Attributes
+    ----------
+    position : numpy array
+        Motor positions at the end of the last scheduled batch.
+    history : list of dict
+        For each scheduled batch, the estimated travel time of the original order ('naive') and of the new order
+            ('planned').
+
+    Methods
+    -------
+    FromMotors(motors, velocity)
+        Creates a scheduler using the 'velocity' of each GA4Beamline motor dict.
+    Schedule(individuals)
+        Returns the order to visit the individuals in.
+    Savings()
+        Returns the total estimated travel time saved so far.
+    """
+
+    def __init__(self, velocity, position = None, twoOpt = True):
+        self.velocity = np.asarray(velocity, dtype = float)
+        self.position = None if position is None else np.asarray(position, dtype = float)
+        self.twoOpt = twoOpt
+        self.history = []
+
+    @classmethod
+    def FromMotors(cls, motors, velocity = 1.0, **kwargs):
+        """
+        Creates a scheduler from GA4Beamline motor dicts, using velocity for motors without a 'velocity' entry.
+        """
+        return cls([motor.get("velocity", velocity) for motor in motors], **kwargs)
+
+    def Schedule(self, individuals):
+        """
+        Finds a short order to visit the individuals in and records the estimated travel times.
+
+        Parameters
+        ----------
+        individuals : numpy array
+            Motor positions with one row per individual (individuals x motors).
+
+        Returns
+        -------
+        numpy array
+            Indexes of individuals in the order they should be evaluated.
+        """
+        individuals = np.asarray(individuals, dtype = float)
+        n = len(individuals)
+
+        if n == 0:
+            return np.zeros(0, dtype = int)
+
+        #Node n is where the motors start; without it, the path starts at the first individual
+        if self.position is None:
+            points = individuals
+            start = 0
+        else:
+            points = np.vstack([individuals, self.position])
+            start = n
+
+        times = TravelTimes(points, self.velocity)
+        naive = [start] + [i for i in range(n) if i != start]
+
+        #Node n + 1 (or n) is a free end point so the path does not have to return anywhere
+        times = np.pad(times, ((0, 1), (0, 1)))
+        end = len(times) - 1
+
+        path = NearestNeighbour(times[:end, :end], start) + [end]
+
+        if self.twoOpt:
+            path = TwoOpt(times, path)
+
+        order = np.array([node for node in path if node < n], dtype = int)
+
+        self.history.append({"naive": PathTime(times, naive), "planned": PathTime(times, path)})
+        self.position = individuals[order[-1]].copy()
+
+        return order
+
+    def Savings(self):
+        return sum(record["naive"] - record["planned"] for record in self.history)
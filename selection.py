@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+#Parent selection operators working on whole fitness arrays.
+
+import numpy as np
+
+def RankingProbabilities(ranking, nPop, s):
+    """
+    Probability of selecting each individual from its rank (0 being the worst), with 1 < s <= 2 setting the pressure.
+    """
+    return (2 - s) / nPop + 2 * ranking * (s - 1) / nPop / (nPop - 1)
+
+def FitnessProbabilities(fitness):
+    """
+    Probability of selecting each individual in proportion to its fitness.  When some fitness values are negative, they
+        are shifted so the worst is 0; if every individual has the same fitness, each is equally likely.
+    """
+    fitness = np.asarray(fitness, dtype = float)
+
+    if fitness.min() < 0:
+        fitness = fitness - fitness.min()
+
+    total = fitness.sum()
+
+    if total <= 0:
+        return np.full(len(fitness), 1 / len(fitness))
+
+    return fitness / total
+
+def StochasticUniversalSampling(probability, n, rng):
+    """
+    Selects n individuals with evenly spaced pointers over the cumulative probability.
+
+    Parameters
+    ----------
+    probability : numpy array
+        Probability of selecting each individual.
+    n : int
+        Number of individuals to select.
+    rng : numpy Generator
+        Source of the random offset.
+
+    Returns
+    -------
+    numpy array
+        Indexes of the selected individuals in increasing order.
+    """
+    cmlProb = np.cumsum(probability)
+    pointers = rng.uniform(0, 1 / n) + np.arange(n) / n
+
+    #An individual is chosen by every pointer that falls within its slice of the cumulative probability
+    selected = np.searchsorted(cmlProb, pointers, side = "left")
+
+    return np.minimum(selected, len(cmlProb) - 1)
+
+def Tournament(fitness, n, k, rng):
+    """
+    Selects n individuals, each the fittest of k individuals drawn at random (with replacement).
+    """
+    fitness = np.asarray(fitness)
+    entrants = rng.integers(0, len(fitness), size = (n, k))
+    winners = np.argmax(fitness[entrants], axis = 1)
+
+    return entrants[np.arange(n), winners]
+
+def Truncation(fitness, n, fraction, rng):
+    """
+    Selects n individuals uniformly at random from the best fraction of the population.
+    """
+    fitness = np.asarray(fitness)
+    m = max(1, int(np.ceil(fraction * len(fitness))))
+
+    #Only the best m need to be found, not the full order
+    best = np.argpartition(-fitness, m - 1)[:m] if m < len(fitness) else np.arange(len(fitness))
+
+    return best[rng.integers(0, m, size = n)]
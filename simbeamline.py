@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+#In-process stand-in for beamline motors and a fitness PV, used to develop and benchmark without a control system.
+
+import asyncio
+import time
+import numpy as np
+from beamline import BeamlineControl
+
+class SimMotor():
+    """
+    Simulated motor that travels at a constant velocity and then settles.
+
+    ...
+
+    Parameters
+    ----------
+    name : str
+        Name of the motor.
+    position : float, optional
+        Starting position (Default value is 0.0).
+    velocity : float, optional
+        Travel speed in units per second (Default value is 1.0).
+    settleTime : float, optional
+        Seconds to wait after reaching the target before the move completes (Default value is 0.0).
+    lo : float, optional
+        Lower limit (Default value is -inf).
+    hi : float, optional
+        Upper limit (Default value is inf).
+
+    Methods
+    -------
+    Readback(now)
+        Returns the position of the motor, including while it is moving.
+    Move(target)
+        Coroutine that moves the motor to target.
+    """
+
+    def __init__(self, name, position = 0.0, velocity = 1.0, settleTime = 0.0, lo = -np.inf, hi = np.inf):
+        if velocity <= 0:
+            raise ValueError(f"{velocity} is not a valid velocity for motor {name}.")
+
+        self.name = name
+        self.velocity = velocity
+        self.settleTime = settleTime
+        self.lo = lo
+        self.hi = hi
+        self.moves = 0
+
+        self._start = self._target = float(position)
+        self._t0 = time.monotonic()
+
+    def Readback(self, now = None):
+        """
+        Returns the position of the motor at time now (Default value is None, which uses the current time).
+        """
+        now = time.monotonic() if now is None else now
+        travelled = self.velocity * max(now - self._t0, 0.0)
+        distance = self._target - self._start
+
+        if travelled >= abs(distance):
+            return self._target
+
+        return self._start + np.sign(distance) * travelled
+
+    async def Move(self, target):
+        """
+        Moves the motor to target and returns once it has arrived and settled.
+        """
+        if not (self.lo <= target <= self.hi):
+            raise ValueError(f"{target} is outside the limits [{self.lo}, {self.hi}] of motor {self.name}.")
+
+        now = time.monotonic()
+
+        self._start = self.Readback(now)
+        self._target = float(target)
+        self._t0 = now
+        self.moves += 1
+
+        await asyncio.sleep(abs(self._target - self._start) / self.velocity + self.settleTime)
+
+class SimBeamline(BeamlineControl):
+    """
+    Simulated beamline whose fitness PV is computed from the current motor readbacks.
+
+    ...
+
+    Parameters
+    ----------
+    motors : list of SimMotor
+        The motors of the beamline.
+    fitness : callable
+        Takes the list of motor readbacks (in the order of motors) and returns the fitness.
+    pv : str, optional
+        Name of the fitness PV (Default value is "SIM:FITNESS").
+    readTime : float, optional
+        Seconds taken by each PV read (Default value is 0.0).
+    noise : float, optional
+        Standard deviation of gaussian noise added to each read (Default value is 0.0).
+    """
+
+    def __init__(self, motors, fitness, pv = "SIM:FITNESS", readTime = 0.0, noise = 0.0):
+        self.motors = {motor.name: motor for motor in motors}
+        self.fitness = fitness
+        self.pv = pv
+        self.readTime = readTime
+        self.noise = noise
+        self.reads = 0
+
+    @classmethod
+    def FromMotors(cls, motors, fitness, velocity = 1.0, settleTime = 0.0, **kwargs):
+        """
+        Creates a simulated beamline from GA4Beamline motor dicts.  Each motor starts in the middle of its range and uses
+            its 'velocity' and 'settleTime' entries when present.
+        """
+        simMotors = [SimMotor(motor["name"], (motor["lo"] + motor["hi"]) / 2, motor.get("velocity", velocity),
+                                motor.get("settleTime", settleTime), motor["lo"], motor["hi"]) for motor in motors]
+
+        return cls(simMotors, fitness, **kwargs)
+
+    def Positions(self, now = None):
+        """
+        Returns the readback of every motor.
+        """
+        return [motor.Readback(now) for motor in self.motors.values()]
+
+    def Value(self, now = None):
+        """
+        Returns the fitness for the current motor readbacks without waiting.
+        """
+        value = float(self.fitness(self.Positions(now)))
+
+        if self.noise > 0:
+            value += np.random.normal(0.0, self.noise)
+
+        return value
+
+    async def Move(self, name, value):
+        await self.motors[name].Move(value)
+
+    async def Readback(self, name):
+        return self.motors[name].Readback()
+
+    async def Read(self, pv):
+        if pv != self.pv:
+            raise KeyError(f"{pv} is not a PV of this beamline.")
+
+        if self.readTime > 0:
+            await asyncio.sleep(self.readTime)
+
+        self.reads += 1
+
+        return self.Value()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+
+#Cheap model of the fitness function used to choose which children are worth measuring.
+
+import numpy as np
+from scipy.linalg import solve_triangular
+
+class Surrogate():
+    """
+    Gaussian process regression of fitness over motor positions with a squared exponential kernel.  The Cholesky factor
+        of the kernel matrix is extended as configurations are added, so each update costs O(n^2) per new point instead
+        of refitting all n points.
+
+    Given to GA4Beamline as surrogate, it learns from every real evaluation, the algorithm breeds oversample times as many
+        children as it needs, and only the most promising of them are measured.
+
+    ...
+
+    Parameters
+    ----------
+    lengthScale : float or list of float
+        Distance over which the fitness is correlated, for every motor or for each motor.
+    noise : float, optional
+        Measurement noise variance relative to the variance of the fitness (Default value is 1e-4).
+    explore : float, optional
+        Weight of the predicted standard deviation when ranking children; 0 only uses the predicted fitness (Default
+            value is 1.0).
+    oversample : int, optional
+        Number of children bred for each one measured (Default value is 4).
+    maxPoints : int, optional
+        Maximum number of configurations in the model.  When full, it is refit on the most recent half (Default value
+            is 2000).
+
+    Attributes
+    ----------
+    size : int
+        Number of configurations in the model.
+    screened : int
+        Number of children that were not measured because of the model.
+
+    Methods
+    -------
+    FromMotors(motors, scale)
+        Creates a surrogate with length scales set to a fraction of each GA4Beamline motor's range.
+    Update(individuals, values)
+        Adds evaluated configurations to the model.
+    Predict(individuals)
+        Returns the predicted fitness and its standard deviation for each individual.
+    Screen(individuals, n)
+        Returns the indexes of the n most promising individuals.
+    Clear()
+        Empties the model.
+    """
+
+    def __init__(self, lengthScale, noise = 1e-4, explore = 1.0, oversample = 4, maxPoints = 2000):
+        self.lengthScale = np.asarray(lengthScale, dtype = float)
+        self.noise = noise
+        self.explore = explore
+        self.oversample = int(oversample)
+        self.maxPoints = maxPoints
+        self.screened = 0
+
+        if np.any(self.lengthScale <= 0):
+            raise ValueError(f"{lengthScale} is not a valid length scale.")
+        if self.oversample < 1:
+            raise ValueError(f"{oversample} is not a valid oversample.")
+
+        self.Clear()
+
+    @classmethod
+    def FromMotors(cls, motors, scale = 0.1, **kwargs):
+        """
+        Creates a surrogate from GA4Beamline motor dicts with length scales of scale times each motor's range.
+        """
+        return cls([scale * (motor["hi"] - motor["lo"]) for motor in motors], **kwargs)
+
+    def Clear(self):
+        """
+        Empties the model.
+        """
+        self.size = 0
+        self._x = np.zeros((0, 0))
+        self._y = np.zeros(0)
+        self._chol = np.zeros((0, 0))
+
+    def _Kernel(self, a, b):
+        a = a / self.lengthScale
+        b = b / self.lengthScale
+        sqDist = np.sum(a**2, axis = 1)[:, np.newaxis] + np.sum(b**2, axis = 1) - 2 * a @ b.T
+
+        return np.exp(-0.5 * np.maximum(sqDist, 0.0))
+
+    def _Grow(self, n, nMotors):
+        """
+        Makes room for n configurations, doubling the storage as needed.
+        """
+        capacity = len(self._y)
+
+        if n <= capacity:
+            return
+
+        capacity = max(n, 2 * capacity, 64)
+        x = np.zeros((capacity, nMotors))
+        y = np.zeros(capacity)
+        chol = np.zeros((capacity, capacity))
+
+        if self.size > 0:
+            x[:self.size] = self._x[:self.size]
+            y[:self.size] = self._y[:self.size]
+            chol[:self.size, :self.size] = self._chol[:self.size, :self.size]
+
+        self._x, self._y, self._chol = x, y, chol
+
+    def _Extend(self, x, y):
+        """
+        Appends the configurations x to the Cholesky factor.  Returns False, leaving the model unchanged, if they make
+            the kernel matrix singular.
+        """
+        n = self.size
+        m = len(x)
+        chol = self._chol[:n, :n]
+
+        #[[L, 0], [S', L22]] factors [[K11, K12], [K12', K22]] when L S = K12 and L22 L22' = K22 - S'S
+        cross = solve_triangular(chol, self._Kernel(self._x[:n], x), lower = True) if n > 0 else np.zeros((0, m))
+        corner = self._Kernel(x, x) + self.noise * np.eye(m) - cross.T @ cross
+
+        try:
+            corner = np.linalg.cholesky(corner)
+        except np.linalg.LinAlgError:
+            return False
+
+        self._Grow(n + m, x.shape[1])
+        self._x[n:n + m] = x
+        self._y[n:n + m] = y
+        self._chol[n:n + m, :n] = cross.T
+        self._chol[n:n + m, n:n + m] = corner
+        self.size = n + m
+
+        return True
+
+    def Update(self, individuals, values):
+        """
+        Adds evaluated configurations to the model.
+
+        Parameters
+        ----------
+        individuals : numpy array
+            Motor positions with one row per individual (individuals x motors).
+        values : numpy array
+            Measured fitness of each individual.
+        """
+        individuals = np.asarray(individuals, dtype = float)
+        values = np.asarray(values, dtype = float)
+
+        if self.size + len(individuals) > self.maxPoints:
+            #Refit on the most recent configurations so the model follows where the population is now
+            keep = max(self.maxPoints // 2 - len(individuals), 0)
+            x = np.concatenate([self._x[self.size - keep:self.size], individuals])[-self.maxPoints:]
+            y = np.concatenate([self._y[self.size - keep:self.size], values])[-self.maxPoints:]
+
+            self.Clear()
+            individuals, values = x, y
+
+        if not self._Extend(individuals, values):
+            #Configurations too close to ones already in the model are skipped
+            for i in range(len(individuals)):
+                self._Extend(individuals[i:i + 1], values[i:i + 1])
+
+    def Predict(self, individuals):
+        """
+        Returns the predicted fitness and its standard deviation for each row of individuals.
+        """
+        individuals = np.asarray(individuals, dtype = float)
+        n = self.size
+
+        if n == 0:
+            return np.zeros(len(individuals)), np.ones(len(individuals))
+
+        y = self._y[:n]
+        mean = y.mean()
+        scale = y.std() if y.std() > 0 else 1.0
+        chol = self._chol[:n, :n]
+
+        weights = solve_triangular(chol, (y - mean) / scale, lower = True)
+        cross = solve_triangular(chol, self._Kernel(self._x[:n], individuals), lower = True)
+
+        prediction = mean + scale * (cross.T @ weights)
+        deviation = scale * np.sqrt(np.maximum(1.0 - np.sum(cross**2, axis = 0), 0.0))
+
+        return prediction, deviation
+
+    def Screen(self, individuals, n):
+        """
+        Returns the indexes of the n rows of individuals with the highest predicted fitness plus explore times its
+            standard deviation, best first.
+        """
+        if len(individuals) <= n:
+            return np.arange(len(individuals))
+
+        prediction, deviation = self.Predict(individuals)
+        score = prediction + self.explore * deviation
+
+        self.screened += len(individuals) - n
+
+        return np.argsort(-score, kind = "stable")[:n]
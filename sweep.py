@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+#Runs grids of GA4Beamline configurations in parallel with reproducible random number streams.
+
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from ga4beamlines import GA4Beamline
+from results import Labels
+
+def Grid(survivorModes, parentModes, cxModes, mutationModes, nPops = (10,)):
+    """
+    Builds every combination of the given modes and population sizes.
+
+    Parameters
+    ----------
+    survivorModes : list of dict
+        Survivor selection modes, e.g. sMode.
+    parentModes : list of dict
+        Parent selection modes, e.g. pMode.
+    cxModes : list of dict
+        Recombination modes, e.g. cxMode.
+    mutationModes : list of dict
+        Mutation modes, e.g. mMode.
+    nPops : list of int, optional
+        Population sizes (Default value is (10,)).
+
+    Returns
+    -------
+    list of dict
+        One configuration per combination with 'survivorMode', 'parentMode', 'cxMode', 'mutationMode', and 'nPop' keys.
+    """
+    configs = []
+
+    for s, p, cx, m, n in itertools.product(survivorModes, parentModes, cxModes, mutationModes, nPops):
+        configs.append({"survivorMode": s, "parentMode": p, "cxMode": cx, "mutationMode": m, "nPop": n})
+
+    return configs
+
+def InitialPopulation(motors, nPop, seed):
+    """
+    Creates a random initial population data frame that can be passed as initPop.
+    """
+    rng = np.random.default_rng(seed)
+    categories = {}
+
+    for motor in motors:
+        categories[motor["name"]] = rng.uniform(motor["lo"], motor["hi"], size = nPop)
+
+    categories["fitness"] = np.zeros(nPop)
+    categories["ranking"] = np.zeros(nPop, dtype = int)
+    categories["probability"] = np.zeros(nPop)
+
+    return pd.DataFrame(categories)
+
+def _RunTask(task):
+    """
+    Runs a single GA4Beamline to completion.  Defined at module level so process pools can pickle it.
+    """
+    initPop = InitialPopulation(task["motors"], task["config"]["nPop"], task["initSeed"])
+
+    ga = GA4Beamline(task["motors"], task["config"]["survivorMode"], task["config"]["parentMode"], task["config"]["cxMode"],
+                        task["config"]["mutationMode"], task["fitness"], nPop = task["config"]["nPop"], initPop = initPop,
+                        seed = task["runSeed"])
+
+    ga.FirstGeneration()
+
+    for g in range(task["generations"]):
+        ga.NextGeneration()
+
+    history = ga.fitHistory.copy()
+    history.insert(0, "generation", np.arange(len(history.index)))
+
+    for key, value in reversed(list({**task["labels"], **Labels(ga)}.items())):
+        history.insert(0, key, value)
+
+    return history
+
+def RunSweep(configs, motors, fitness, generations = 500, nInitPops = 1, runsEach = 1, seed = 0, nWorkers = None,
+                store = None):
+    """
+    Runs every configuration from nInitPops initial populations, runsEach times each, on a pool of processes.
+
+    Every run draws from its own random number stream spawned from seed according to its position in the sweep, so the
+        results are the same whatever the number of workers.  The same initial populations are shared by every
+        configuration with the same nPop.
+
+    Parameters
+    ----------
+    configs : list of dict
+        Configurations to run, e.g. from Grid().
+    motors : list of dict
+        Motors passed to GA4Beamline.
+    fitness : dict
+        Fitness passed to GA4Beamline.  Its function must be picklable when nWorkers is not 1.
+    generations : int, optional
+        Number of calls to NextGeneration() in each run (Default value is 500).
+    nInitPops : int, optional
+        Number of different initial populations (Default value is 1).
+    runsEach : int, optional
+        Number of runs from each initial population (Default value is 1).
+    seed : int, optional
+        Root seed of the sweep (Default value is 0).
+    nWorkers : int, optional
+        Number of worker processes; 1 runs everything in the current process (Default value is None, which uses the
+            number of CPUs).
+    store : ResultsStore, optional
+        Store every run is added to, e.g. results.ResultsStore (Default value is None).
+
+    Returns
+    -------
+    pandas data frame
+        The fitness history of every run, one row per generation, with the settings of the run ('config', 'initPop',
+            'run' and the mode parameters) as columns.
+    """
+    initRoot, runRoot = np.random.SeedSequence(seed).spawn(2)
+    initSeeds = initRoot.spawn(nInitPops)
+    runSeeds = runRoot.spawn(len(configs) * nInitPops * runsEach)
+    tasks = []
+
+    for c in range(len(configs)):
+        for i in range(nInitPops):
+            for r in range(runsEach):
+                tasks.append({"config": configs[c], "motors": motors, "fitness": fitness, "generations": generations,
+                                "initSeed": initSeeds[i], "runSeed": runSeeds[len(tasks)],
+                                "labels": {"config": c, "initPop": i, "run": r}})
+
+    nWorkers = nWorkers if nWorkers is not None else (os.cpu_count() or 1)
+
+    if nWorkers == 1:
+        results = [_RunTask(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers = nWorkers) as pool:
+            results = list(pool.map(_RunTask, tasks))
+
+    frame = pd.concat(results, ignore_index = True)
+
+    if store is not None:
+        store.AddFrame(frame)
+
+    return frame
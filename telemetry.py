@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+#Observers notified by GA4Beamline around each stage of a generation, and a collector aggregating what they report.
+
+import json
+import numpy as np
+
+#Edges of the timing histogram bins: 10 per decade from 1 microsecond to 1000 seconds
+BINS = np.logspace(-6, 3, 91)
+
+class Observer():
+    """
+    Base class for objects passed to GA4Beamline as observers.  Every method does nothing; override the ones needed.
+
+    ...
+
+    Methods
+    -------
+    StageStart(ga, stage)
+        Called before each stage (e.g. '_ParentSel') of a generation.
+    StageEnd(ga, stage, seconds)
+        Called after each stage with the time it took.
+    GenerationEnd(ga, record)
+        Called after each generation with a dict describing it.
+    """
+
+    def StageStart(self, ga, stage):
+        pass
+
+    def StageEnd(self, ga, stage, seconds):
+        pass
+
+    def GenerationEnd(self, ga, record):
+        pass
+
+class TelemetryCollector(Observer):
+    """
+    Keeps the record of every generation and a histogram of the time taken by each stage.
+
+    Each record holds 'generation', 'seconds' (whole generation), one '<stage>' entry per stage in seconds,
+        'evaluations', 'cacheHits', 'cacheMisses', 'moveTime' and 'readTime' (epics fitness only), 'diversity',
+        'aveFitness', and 'peakFitness'.
+
+    ...
+
+    Attributes
+    ----------
+    records : list of dict
+        One record per generation.
+    counts : dict of numpy array
+        For each stage, the number of calls whose time fell in each bin of BINS.
+
+    Methods
+    -------
+    Summary()
+        Returns the call count, total, mean, and approximate median and 95th percentile time of each stage.
+    ToDataFrame()
+        Returns the records as a data frame.
+    Export(path)
+        Writes the records to path as JSON lines.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.counts = {}
+
+    def StageEnd(self, ga, stage, seconds):
+        if stage not in self.counts:
+            self.counts[stage] = np.zeros(len(BINS) + 1, dtype = int)
+
+        self.counts[stage][np.searchsorted(BINS, seconds)] += 1
+
+    def GenerationEnd(self, ga, record):
+        self.records.append(record)
+
+    def _Percentile(self, counts, q):
+        #Upper edge of the bin holding the q-th fraction of the calls
+        index = int(np.searchsorted(np.cumsum(counts), q * counts.sum()))
+
+        return float(BINS[min(index, len(BINS) - 1)])
+
+    def Summary(self):
+        summary = {}
+
+        for stage, counts in self.counts.items():
+            total = sum(record.get(stage, 0.0) for record in self.records)
+            summary[stage] = {"calls": int(counts.sum()), "total": total, "mean": total / max(int(counts.sum()), 1),
+                                "p50": self._Percentile(counts, 0.5), "p95": self._Percentile(counts, 0.95)}
+
+        return summary
+
+    def ToDataFrame(self):
+        import pandas as pd
+
+        return pd.DataFrame(self.records)
+
+    def Export(self, path):
+        with open(path, "w") as file:
+            for record in self.records:
+                file.write(json.dumps(record) + "\n")